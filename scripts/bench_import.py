@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Ranks the imports on the server's startup path by cumulative import time.
+
+Runs a fresh interpreter with `-X importtime` and prints the slowest modules,
+flagging those above the threshold as candidates for a lazy import.
+
+Usage (from the project root):
+    python scripts/bench_import.py [--top N] [--threshold-ms MS]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+STARTUP_IMPORTS = (
+    "from src.mcp_instance import mcp; "
+    "from src.tools import calendar_tools, drive_tools, gmail_tools, tasks_tools"
+)
+
+def measure_imports() -> List[Tuple[str, int, int]]:
+    """
+    Imports the server modules in a subprocess and parses the importtime report.
+    
+    Returns:
+        A list of (module, self_us, cumulative_us) tuples, slowest first.
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_IMPORTS],
+        cwd=project_root, capture_output=True, text=True, check=True
+    )
+    
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # header line
+        timings.append((module.strip(), int(self_us), int(cumulative_us)))
+    
+    timings.sort(key=lambda timing: timing[2], reverse=True)
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--top", type=int, default=25, help="Number of modules to show")
+    parser.add_argument("--threshold-ms", type=float, default=50.0, help="Flag imports slower than this")
+    args = parser.parse_args()
+    
+    timings = measure_imports()
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module, self_us, cumulative_us in timings[:args.top]:
+        flag = "  <- lazy import candidate" if cumulative_us / 1000 > args.threshold_ms else ""
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {module}{flag}")
+
+if __name__ == "__main__":
+    main()
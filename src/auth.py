@@ -1,42 +1,93 @@
 import os
+import sys
+import asyncio
+from typing import Optional, Tuple
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
 
 # Define the scopes for the Google APIs
-SCOPES = [
+SCOPES: Tuple[str, ...] = tuple(sys.intern(scope) for scope in (
     "https://www.googleapis.com/auth/drive.readonly",
     "https://www.googleapis.com/auth/gmail.readonly",
     "https://www.googleapis.com/auth/calendar.readonly",
     "https://www.googleapis.com/auth/tasks",
-]
+))
+
+# Process-wide credentials, loaded from token.json once and refreshed in place
+_CREDS_CACHE: Optional[Credentials] = None
+# In-flight load/refresh shared by concurrent callers (single-flight)
+_REFRESH_FUTURE: Optional[asyncio.Future] = None
+
+def _save_credentials(creds: Credentials) -> None:
+    with open("token.json", "w") as token:
+        token.write(creds.to_json())
 
 def get_credentials() -> Credentials:
     """
     Handles the OAuth 2.0 flow to get valid credentials.
 
-    This function looks for a `token.json` file, which stores the user's access
-    and refresh tokens. If the file doesn't exist or the credentials are
-    expired, it initiates the OAuth 2.0 authorization flow.
+    The credentials are cached for the lifetime of the process. This function
+    only touches `token.json` on the first call, or when the cached credentials
+    are no longer valid. Expired credentials are refreshed in place; if there
+    is nothing usable to refresh, it initiates the OAuth 2.0 authorization flow.
 
     Returns:
         A `google.oauth2.credentials.Credentials` object.
     """
-    creds = None
-    if os.path.exists("token.json"):
+    global _CREDS_CACHE
+
+    creds = _CREDS_CACHE
+    if creds and creds.valid:
+        return creds
+
+    if creds is None and os.path.exists("token.json"):
         creds = Credentials.from_authorized_user_file("token.json", SCOPES)
 
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
+            # Imported here: the transport pulls in `requests`, which is only
+            # needed once a token actually has to be refreshed
+            from google.auth.transport.requests import Request
+            previous_token = creds.token
             creds.refresh(Request())
+            if creds.token != previous_token:
+                _save_credentials(creds)
         else:
+            from google_auth_oauthlib.flow import InstalledAppFlow
             flow = InstalledAppFlow.from_client_secrets_file(
                 "credentials.json", SCOPES
             )
             creds = flow.run_local_server(port=0)
+            _save_credentials(creds)
 
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-
+    _CREDS_CACHE = creds
     return creds
 
+def _clear_refresh_future(future: asyncio.Future) -> None:
+    global _REFRESH_FUTURE
+    if _REFRESH_FUTURE is future:
+        _REFRESH_FUTURE = None
+
+async def get_credentials_async() -> Credentials:
+    """
+    Async variant of `get_credentials` for use inside tools.
+
+    Valid cached credentials are returned without leaving the event loop. Only
+    the load/refresh branch, which does file and network I/O, is run in a
+    worker thread. Concurrent callers that arrive while it is running await the
+    same in-flight future, so an expired token is refreshed exactly once.
+
+    Returns:
+        A `google.oauth2.credentials.Credentials` object.
+    """
+    global _REFRESH_FUTURE
+
+    creds = _CREDS_CACHE
+    if creds is not None and creds.valid:
+        return creds
+
+    if _REFRESH_FUTURE is None:
+        _REFRESH_FUTURE = asyncio.ensure_future(asyncio.to_thread(get_credentials))
+        _REFRESH_FUTURE.add_done_callback(_clear_refresh_future)
+
+    # Shielded so a cancelled caller does not cancel the refresh for the others
+    return await asyncio.shield(_REFRESH_FUTURE)
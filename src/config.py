@@ -1,9 +1,24 @@
 import os
+import sys
 import logging
-from typing import List
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Configuration is read from the environment once per process. Getters return
+# immutable values so the cached results can be shared safely between callers;
+# the calendar ID getters keep their list return type by caching a tuple in a
+# private helper and returning a fresh list copy of it.
+
+@lru_cache(maxsize=1)
+def _default_calendar_ids() -> Tuple[str, ...]:
+    default_calendars = os.getenv('DEFAULT_CALENDAR_IDS', 'primary')
+    calendar_ids = tuple(cal.strip() for cal in default_calendars.split(',') if cal.strip())
+    
+    logger.debug("Default calendar IDs: %s", calendar_ids)
+    return calendar_ids
+
 def get_default_calendar_ids() -> List[str]:
     """
     Retrieves the list of default calendar IDs from environment variables.
@@ -12,24 +27,12 @@ def get_default_calendar_ids() -> List[str]:
         A list of calendar IDs to use as defaults when no specific calendar is specified.
         If no environment variable is set, returns ['primary'] as default.
     """
-    default_calendars = os.getenv('DEFAULT_CALENDAR_IDS', 'primary')
-    calendar_ids = [cal.strip() for cal in default_calendars.split(',') if cal.strip()]
-    
-    logger.info(f"Default calendar IDs: {calendar_ids}")
-    return calendar_ids
+    return list(_default_calendar_ids())
 
-def validate_calendar_ids(calendar_ids: List[str]) -> List[str]:
-    """
-    Validates and normalizes calendar IDs.
-    
-    Args:
-        calendar_ids: List of calendar IDs to validate
-        
-    Returns:
-        List of validated calendar IDs
-    """
+@lru_cache(maxsize=64)
+def _validate_calendar_ids(calendar_ids: Tuple[str, ...]) -> Tuple[str, ...]:
     if not calendar_ids:
-        return get_default_calendar_ids()
+        return _default_calendar_ids()
     
     # Remove duplicates while preserving order
     seen = set()
@@ -42,11 +45,24 @@ def validate_calendar_ids(calendar_ids: List[str]) -> List[str]:
     
     if not validated_ids:
         logger.warning("No valid calendar IDs provided, using defaults")
-        return get_default_calendar_ids()
+        return _default_calendar_ids()
     
-    logger.info(f"Validated calendar IDs: {validated_ids}")
-    return validated_ids
+    logger.debug("Validated calendar IDs: %s", validated_ids)
+    return tuple(validated_ids)
+
+def validate_calendar_ids(calendar_ids: Optional[Sequence[str]]) -> List[str]:
+    """
+    Validates and normalizes calendar IDs.
+    
+    Args:
+        calendar_ids: List of calendar IDs to validate
+        
+    Returns:
+        List of validated calendar IDs
+    """
+    return list(_validate_calendar_ids(tuple(calendar_ids or ())))
 
+@lru_cache(maxsize=1)
 def get_default_task_list_id() -> str:
     """
     Retrieves the default task list ID from environment variables.
@@ -56,9 +72,10 @@ def get_default_task_list_id() -> str:
         If no environment variable is set, returns '@default' as default.
     """
     default_task_list = os.getenv('DEFAULT_TASK_LIST_ID', '@default')
-    logger.info(f"Default task list ID: {default_task_list}")
+    logger.debug("Default task list ID: %s", default_task_list)
     return default_task_list
 
+@lru_cache(maxsize=128)
 def validate_task_list_id(task_list_id: str) -> str:
     """
     Validates and normalizes task list ID.
@@ -74,24 +91,28 @@ def validate_task_list_id(task_list_id: str) -> str:
         return get_default_task_list_id()
     
     validated_id = task_list_id.strip()
-    logger.info(f"Validated task list ID: {validated_id}")
+    logger.debug("Validated task list ID: %s", validated_id)
     return validated_id
 
-def get_supported_content_search_types() -> List[str]:
+# Kept as an ordered tuple (not a set) so the generated Drive query is stable
+_SUPPORTED_CONTENT_SEARCH_TYPES: Tuple[str, ...] = tuple(sys.intern(mime_type) for mime_type in (
+    'application/vnd.google-apps.document',  # Google Docs
+    'application/pdf',  # PDF files
+    'text/plain',  # Plain text files
+    'text/csv',  # CSV files
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',  # DOCX
+))
+
+def get_supported_content_search_types() -> Tuple[str, ...]:
     """
-    Returns the list of MIME types that support content search.
+    Returns the MIME types that support content search.
     
     Returns:
-        List of MIME types that can be searched for content.
+        Tuple of MIME types that can be searched for content.
     """
-    return [
-        'application/vnd.google-apps.document',  # Google Docs
-        'application/pdf',  # PDF files
-        'text/plain',  # Plain text files
-        'text/csv',  # CSV files
-        'application/vnd.openxmlformats-officedocument.wordprocessingml.document',  # DOCX
-    ]
+    return _SUPPORTED_CONTENT_SEARCH_TYPES
 
+@lru_cache(maxsize=1)
 def get_max_content_search_results() -> int:
     """
     Returns the maximum number of results for content search.
@@ -101,6 +122,7 @@ def get_max_content_search_results() -> int:
     """
     return int(os.getenv('MAX_CONTENT_SEARCH_RESULTS', '50'))
 
+@lru_cache(maxsize=1)
 def get_content_search_snippet_length() -> int:
     """
     Returns the length of search result snippets in characters.
@@ -110,6 +132,98 @@ def get_content_search_snippet_length() -> int:
     """
     return int(os.getenv('CONTENT_SEARCH_SNIPPET_LENGTH', '200'))
 
+@lru_cache(maxsize=1)
+def get_content_search_max_snippets() -> int:
+    """
+    Returns the maximum number of snippets returned per matching file.
+    
+    Returns:
+        Maximum number of content search snippets per file.
+    """
+    return int(os.getenv('CONTENT_SEARCH_MAX_SNIPPETS', '20'))
+
+@lru_cache(maxsize=1)
+def get_content_search_concurrency() -> int:
+    """
+    Returns how many files content search downloads and scans at once.
+    
+    Returns:
+        Maximum number of concurrent file extractions per search.
+    """
+    return int(os.getenv('CONTENT_SEARCH_CONCURRENCY', '8'))
+
+@lru_cache(maxsize=1)
+def get_pdf_parse_workers() -> int:
+    """
+    Returns the number of worker processes used to extract text from PDFs.
+    
+    Returns:
+        Size of the PDF parsing process pool; defaults to the number of CPUs.
+    """
+    return int(os.getenv('PDF_PARSE_WORKERS', str(os.cpu_count() or 1)))
+
+@lru_cache(maxsize=1)
+def get_content_cache_dir() -> str:
+    """
+    Returns the directory of the on-disk cache of extracted file text.
+    
+    Returns:
+        Path to the content cache directory.
+    """
+    default_dir = os.path.join(os.path.expanduser('~'), '.cache', 'google-workspace-mcp', 'content')
+    return os.getenv('CONTENT_CACHE_DIR', default_dir)
+
+@lru_cache(maxsize=1)
+def get_content_cache_size_mb() -> int:
+    """
+    Returns the size limit of the on-disk content cache.
+    
+    Returns:
+        Maximum cache size in megabytes; 0 disables the cache.
+    """
+    return int(os.getenv('CONTENT_CACHE_SIZE_MB', '500'))
+
+@lru_cache(maxsize=1)
+def get_gmail_max_body_bytes() -> int:
+    """
+    Returns how much of a message body get_gmail_message_details returns.
+    
+    Returns:
+        Maximum number of body bytes to decode; 0 returns the full body.
+    """
+    return int(os.getenv('GMAIL_MAX_BODY_BYTES', '102400'))
+
+@lru_cache(maxsize=1)
+def get_gmail_label_cache_ttl() -> float:
+    """
+    Returns how long the user's Gmail label list is reused.
+    
+    Returns:
+        Time to live of the cached label list in seconds; 0 disables the cache.
+    """
+    return float(os.getenv('GMAIL_LABEL_CACHE_TTL_SECONDS', '300'))
+
+@lru_cache(maxsize=1)
+def get_query_cache_ttl() -> float:
+    """
+    Returns how long identical search results are reused.
+    
+    Returns:
+        Time to live of cached search results in seconds; 0 disables the cache.
+    """
+    return float(os.getenv('QUERY_CACHE_TTL_SECONDS', '60'))
+
+@lru_cache(maxsize=1)
+def get_query_cache_size() -> int:
+    """
+    Returns the maximum number of cached search results.
+    
+    Returns:
+        Maximum number of entries in the search result cache.
+    """
+    return int(os.getenv('QUERY_CACHE_SIZE', '512'))
+
+@lru_cache(maxsize=1)
 def get_max_task_search_results() -> int:
     """
     Returns the maximum number of results for task search operations.
@@ -119,6 +233,7 @@ def get_max_task_search_results() -> int:
     """
     return int(os.getenv('MAX_TASK_SEARCH_RESULTS', '100'))
 
+@lru_cache(maxsize=1)
 def get_default_task_max_results() -> int:
     """
     Returns the default maximum number of results for task listing operations.
@@ -126,4 +241,71 @@ def get_default_task_max_results() -> int:
     Returns:
         Default maximum number of tasks to return when listing.
     """
-    return int(os.getenv('DEFAULT_TASK_MAX_RESULTS', '100')) 
\ No newline at end of file
+    return int(os.getenv('DEFAULT_TASK_MAX_RESULTS', '100'))
+
+@lru_cache(maxsize=1)
+def get_io_workers() -> int:
+    """
+    Returns the number of worker threads used for blocking Google API calls.
+    
+    Returns:
+        Size of the shared I/O thread pool.
+    """
+    return int(os.getenv('MCP_IO_WORKERS', '8'))
+
+@lru_cache(maxsize=1)
+def is_eager_import_enabled() -> bool:
+    """
+    Returns whether all tool modules should be imported when `src.tools` is imported.
+    
+    Returns:
+        True if the EAGER_IMPORT environment variable is set to a truthy value.
+    """
+    return os.getenv('EAGER_IMPORT', '').strip().lower() in ('1', 'true', 'yes')
+
+@lru_cache(maxsize=1)
+def get_log_level() -> str:
+    """
+    Returns the logging level for the server.
+    
+    Returns:
+        The level name from the MCP_LOG_LEVEL environment variable, defaulting to 'WARNING'.
+        Names the logging module does not know also fall back to 'WARNING'.
+    """
+    log_level = os.getenv('MCP_LOG_LEVEL', 'WARNING').strip().upper()
+    # getLevelName maps a known level name to its number
+    if not isinstance(logging.getLevelName(log_level), int):
+        logger.warning("Unknown MCP_LOG_LEVEL %r, using WARNING", log_level)
+        return 'WARNING'
+    return log_level
+
+def clear_cache() -> None:
+    """
+    Clears all cached configuration values.
+    
+    Call this after changing environment variables at runtime (e.g. in tests)
+    so the next lookup re-reads them.
+    """
+    for getter in (
+        _default_calendar_ids,
+        _validate_calendar_ids,
+        get_default_task_list_id,
+        validate_task_list_id,
+        get_max_content_search_results,
+        get_content_search_snippet_length,
+        get_content_search_max_snippets,
+        get_content_search_concurrency,
+        get_pdf_parse_workers,
+        get_content_cache_dir,
+        get_content_cache_size_mb,
+        get_gmail_max_body_bytes,
+        get_gmail_label_cache_ttl,
+        get_query_cache_ttl,
+        get_query_cache_size,
+        get_max_task_search_results,
+        get_default_task_max_results,
+        get_io_workers,
+        is_eager_import_enabled,
+        get_log_level,
+    ):
+        getter.cache_clear()
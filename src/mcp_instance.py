@@ -1,9 +1,137 @@
+import asyncio
+import atexit
+import functools
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
 from mcp.server.fastmcp import FastMCP
 
+from src.auth import get_credentials_async
+from src.config import get_io_workers
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # Initialize the FastMCP server instance
 mcp = FastMCP("google-workspace")
-logger.info("Initialized FastMCP server instance: google-workspace")
+
+# Shared pool for blocking Google API calls, sized independently of the
+# default asyncio executor so concurrent tool calls reuse a fixed set of threads
+_EXECUTOR = ThreadPoolExecutor(max_workers=get_io_workers(), thread_name_prefix="mcp-io")
+atexit.register(_EXECUTOR.shutdown, wait=False)
+
+async def run_io(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs a blocking function on the shared I/O executor and awaits its result.
+
+    Args:
+        fn: The blocking callable to run.
+        *args: Positional arguments for `fn`.
+        **kwargs: Keyword arguments for `fn`.
+
+    Returns:
+        Whatever `fn` returns.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_EXECUTOR, functools.partial(fn, *args, **kwargs))
+
+async def gather_with_concurrency(limit: int, *aws: Awaitable[Any], return_exceptions: bool = False) -> List[Any]:
+    """
+    Like `asyncio.gather`, but runs at most `limit` of the awaitables at once.
+
+    Args:
+        limit: The maximum number of awaitables in flight.
+        *aws: The coroutines to run.
+        return_exceptions: Passed through to `asyncio.gather`.
+
+    Returns:
+        The results, in the order of `aws`.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _bounded(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(_bounded(aw) for aw in aws), return_exceptions=return_exceptions)
+
+class _ThreadLocalHttp:
+    """
+    Stand-in for `httplib2.Http` that gives each thread its own connection pool.
+
+    `httplib2.Http` is not thread-safe, but cached API clients are shared by
+    concurrent calls running on the I/O executor. Each worker thread lazily
+    gets its own `Http`, so connections are still kept alive between calls.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _http(self):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            from googleapiclient.http import build_http
+            http = self._local.http = build_http()
+        return http
+
+    def request(self, *args, **kwargs):
+        return self._http().request(*args, **kwargs)
+
+    def close(self):
+        self._http().close()
+
+    def __getattr__(self, name):
+        return getattr(self._http(), name)
+
+# One keep-alive transport shared by every API client, so connections opened
+# for one tool are reused by the others
+_HTTP = _ThreadLocalHttp()
+
+# Built Google API clients, keyed by (api, version, id(credentials))
+_SERVICE_CACHE: Dict[Tuple[str, str, int], Any] = {}
+# Per-API locks serializing client builds, keyed by (api, version)
+_BUILD_LOCKS: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+async def get_service(api: str, version: str) -> Any:
+    """
+    Returns a Google API client for the given API, building it at most once.
+
+    Building a client parses the API's discovery document, so the resulting
+    Resource is cached and reused for as long as the credentials object it was
+    built with stays in use. The client is safe to use from several I/O
+    threads at once.
+
+    Args:
+        api: The API name, e.g. "calendar".
+        version: The API version, e.g. "v3".
+
+    Returns:
+        A `googleapiclient` Resource for the API.
+    """
+    creds = await get_credentials_async()
+    key = (api, version, id(creds))
+    service = _SERVICE_CACHE.get(key)
+    if service is not None:
+        return service
+
+    # Concurrent first calls for the same API wait for a single build instead
+    # of each parsing the discovery document
+    lock = _BUILD_LOCKS.setdefault((api, version), asyncio.Lock())
+    async with lock:
+        service = _SERVICE_CACHE.get(key)
+        if service is None:
+            # The discovery and transport modules are slow to import, so they
+            # are loaded on the first API call rather than at server startup
+            from google_auth_httplib2 import AuthorizedHttp
+            from googleapiclient.discovery import build
+            service = await run_io(
+                build, api, version, http=AuthorizedHttp(creds, http=_HTTP),
+                cache_discovery=False, static_discovery=True
+            )
+            # Clients built for credentials that have since been replaced (e.g.
+            # by a new authorization flow) are never used again
+            for stale_key in [k for k in _SERVICE_CACHE if k[2] != key[2]]:
+                del _SERVICE_CACHE[stale_key]
+            _SERVICE_CACHE[key] = service
+    return service
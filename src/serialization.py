@@ -0,0 +1,34 @@
+from typing import Any
+
+try:
+    import orjson
+
+    def to_json(obj: Any) -> str:
+        """
+        Serializes a tool response to a JSON string.
+
+        Uses `orjson` when it is installed, which is several times faster than
+        the standard library encoder for large responses.
+
+        Args:
+            obj: The JSON-compatible object to serialize.
+
+        Returns:
+            The JSON document as a string.
+        """
+        return orjson.dumps(obj).decode()
+
+except ImportError:  # pragma: no cover - exercised only without orjson
+    import json
+
+    def to_json(obj: Any) -> str:
+        """
+        Serializes a tool response to a JSON string.
+
+        Args:
+            obj: The JSON-compatible object to serialize.
+
+        Returns:
+            The JSON document as a string.
+        """
+        return json.dumps(obj)
@@ -1,32 +1,43 @@
-import sys
-import os
+"""
+Google Workspace MCP Server entry point.
+
+Run from the project root with `python -m src.server`, or via the root
+`server.py` script.
+"""
+
 import logging
+import sys
+
+from src.config import get_log_level
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# Add the project root to the Python path
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, project_root)
-logger.info(f"Added project root to Python path: {project_root}")
+def main() -> None:
+    """
+    Configures logging, registers all tools and runs the MCP server over stdio.
+    """
+    # stdout carries the MCP stdio protocol, so logs must go to stderr
+    logging.basicConfig(
+        level=get_log_level(),
+        stream=sys.stderr,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 
-try:
-    from src.mcp_instance import mcp
-    logger.info("Successfully imported MCP instance")
-    
-    # Import the tool modules to ensure the tools are registered
-    from src.tools import calendar_tools, drive_tools, gmail_tools, tasks_tools
-    logger.info("Successfully imported all tool modules")
-    
-    logger.info("Starting MCP server...")
-    
-    if __name__ == "__main__":
+    try:
+        from src.mcp_instance import mcp
+        logger.info("Successfully imported MCP instance")
+        
+        # Import the tool modules to ensure the tools are registered
+        from src.tools import calendar_tools, drive_tools, gmail_tools, tasks_tools
+        logger.info("Successfully imported all tool modules")
+        
+        logger.info("Starting MCP server...")
+        
         mcp.run(transport='stdio')
         
-except Exception as e:
-    logger.error(f"Failed to start server: {e}")
-    raise
+    except Exception as e:
+        logger.error(f"Failed to start server: {e}")
+        raise
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,31 @@
-# Import all tool modules to ensure they are registered with MCP
-from . import calendar_tools
-from . import drive_tools
-from . import gmail_tools
-from . import tasks_tools
+# Tool modules register themselves with MCP when imported. They are loaded
+# lazily on first attribute access (PEP 562) so importing `src.tools` does not
+# pull in every Google API client stack; the server entry points import all of
+# them explicitly at startup. Set EAGER_IMPORT=1 to import them up front.
+import importlib
+
+from src.config import is_eager_import_enabled
+
+_LAZY_MODULES = frozenset({
+    'calendar_tools',
+    'drive_tools',
+    'gmail_tools',
+    'tasks_tools',
+})
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | _LAZY_MODULES)
+
+if is_eager_import_enabled():
+    for _name in sorted(_LAZY_MODULES):
+        __getattr__(_name)
 
 # Export the tools for easy access
 __all__ = [
@@ -0,0 +1,76 @@
+# On-disk cache of text extracted from Drive files, so repeated content
+# searches skip the download and parsing. Entries are keyed by file ID and
+# modifiedTime, so an edited file is never served stale text. The cache is
+# disabled when diskcache is not installed or CONTENT_CACHE_SIZE_MB is 0.
+import logging
+from typing import Any, Optional
+
+from src.config import get_content_cache_dir, get_content_cache_size_mb
+
+logger = logging.getLogger(__name__)
+
+_CACHE: Optional[Any] = None
+_CACHE_UNAVAILABLE = False
+
+def _get_cache() -> Optional[Any]:
+    global _CACHE, _CACHE_UNAVAILABLE
+    if _CACHE is None and not _CACHE_UNAVAILABLE:
+        size_mb = get_content_cache_size_mb()
+        if size_mb <= 0:
+            _CACHE_UNAVAILABLE = True
+            return None
+        try:
+            import diskcache
+        except ImportError:
+            logger.debug("diskcache is not installed; content cache disabled")
+            _CACHE_UNAVAILABLE = True
+            return None
+        _CACHE = diskcache.Cache(
+            get_content_cache_dir(),
+            size_limit=size_mb * 1024 * 1024,
+            eviction_policy="least-recently-used",
+        )
+    return _CACHE
+
+def _key(file_id: str, modified_time: str) -> str:
+    return f"{file_id}:{modified_time}"
+
+def get_cached_content(file_id: str, modified_time: Optional[str]) -> Optional[str]:
+    """
+    Returns previously extracted text for a file revision.
+    
+    Args:
+        file_id: The Drive file ID.
+        modified_time: The file's modifiedTime; without it nothing is cached.
+        
+    Returns:
+        The cached text, or None on a miss.
+    """
+    cache = _get_cache()
+    if cache is None or not modified_time:
+        return None
+    return cache.get(_key(file_id, modified_time))
+
+def set_cached_content(file_id: str, modified_time: Optional[str], content: str) -> None:
+    """
+    Stores extracted text for a file revision.
+    
+    Args:
+        file_id: The Drive file ID.
+        modified_time: The file's modifiedTime; without it nothing is cached.
+        content: The extracted text.
+    """
+    cache = _get_cache()
+    if cache is None or not modified_time:
+        return
+    cache.set(_key(file_id, modified_time), content)
+
+def reset() -> None:
+    """
+    Closes the cache so the next lookup re-reads the configuration.
+    """
+    global _CACHE, _CACHE_UNAVAILABLE
+    if _CACHE is not None:
+        _CACHE.close()
+    _CACHE = None
+    _CACHE_UNAVAILABLE = False
@@ -0,0 +1,21 @@
+import io
+
+# Kept in its own small module so PDF worker processes do not import the MCP
+# server and Google API client stacks. PyPDF2 itself is imported on first use,
+# so servers that never search PDFs do not pay for loading it.
+
+def parse_pdf_bytes(data: bytes) -> str:
+    """
+    Extracts the text of every page of a PDF.
+    
+    Args:
+        data: The raw PDF file contents.
+        
+    Returns:
+        The text of all pages, each followed by a newline.
+    """
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    # Malformed pages can yield None instead of text
+    return "".join((page.extract_text() or "") + "\n" for page in pdf_reader.pages)
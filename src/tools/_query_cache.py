@@ -0,0 +1,72 @@
+# Short-lived cache of serialized search results. MCP clients often repeat
+# the same search within seconds (agent retries, chained calls), so identical
+# searches within QUERY_CACHE_TTL_SECONDS return the previous response.
+# Search tools take a `no_cache` flag for callers that need fresh results.
+from typing import Any, Hashable, Optional, Tuple
+
+from cachetools import TTLCache
+
+from src.config import get_query_cache_ttl, get_query_cache_size
+
+_CACHE: Optional[TTLCache] = None
+
+def _get_cache() -> Optional[TTLCache]:
+    global _CACHE
+    if _CACHE is None:
+        ttl = get_query_cache_ttl()
+        if ttl <= 0:
+            return None
+        _CACHE = TTLCache(maxsize=get_query_cache_size(), ttl=ttl)
+    return _CACHE
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def cache_key(tool_name: str, *args: Any) -> Tuple:
+    """
+    Builds a cache key from a tool name and its arguments.
+    
+    Args:
+        tool_name: The name of the tool.
+        *args: The tool's arguments; lists are converted to tuples.
+        
+    Returns:
+        A hashable key.
+    """
+    return (tool_name, *(_freeze(arg) for arg in args))
+
+def get_cached_result(key: Tuple) -> Optional[str]:
+    """
+    Returns the cached response for a key, if it has not expired.
+    
+    Args:
+        key: A key from `cache_key`.
+        
+    Returns:
+        The cached JSON response, or None.
+    """
+    cache = _get_cache()
+    if cache is None:
+        return None
+    return cache.get(key)
+
+def set_cached_result(key: Tuple, result: str) -> None:
+    """
+    Stores a successful response for a key.
+    
+    Args:
+        key: A key from `cache_key`.
+        result: The JSON response to cache.
+    """
+    cache = _get_cache()
+    if cache is not None:
+        cache[key] = result
+
+def clear() -> None:
+    """
+    Drops all cached responses and re-reads the cache configuration on next use.
+    """
+    global _CACHE
+    _CACHE = None
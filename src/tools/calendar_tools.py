@@ -1,12 +1,24 @@
-import json
 import asyncio
+import heapq
+import logging
 from typing import List, Optional
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from src.auth import get_credentials
 from src.config import validate_calendar_ids, get_default_calendar_ids
-from src.mcp_instance import mcp
+from src.serialization import to_json
+from src.mcp_instance import mcp, get_service, run_io
+
+logger = logging.getLogger(__name__)
+
+# The Calendar API accepts at most 50 calls in a single batch request
+_CALENDAR_BATCH_LIMIT = 50
+
+def _event_start_key(event: dict) -> str:
+    """
+    Returns the sort key for an event: its start dateTime, or date for all-day events.
+    """
+    start = event.get("start") or {}
+    return start.get("dateTime") or start.get("date") or ""
 
 @mcp.tool()
 async def list_calendars() -> str:
@@ -16,14 +28,13 @@ async def list_calendars() -> str:
     Returns:
         A JSON string representing a list of calendars.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "calendar", "v3", credentials=creds)
+        service = await get_service("calendar", "v3")
         
         def _list_calendars():
             return service.calendarList().list().execute()
 
-        calendar_list = await asyncio.to_thread(_list_calendars)
+        calendar_list = await run_io(_list_calendars)
         calendars = calendar_list.get("items", [])
         
         # Extract relevant information
@@ -37,9 +48,9 @@ async def list_calendars() -> str:
                 "primary": calendar.get("primary", False)
             })
         
-        return json.dumps(calendar_info)
+        return to_json(calendar_info)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def list_calendar_events(calendar_ids: Optional[List[str]] = None, start_time: str = None, end_time: str = None, query: Optional[str] = None, max_results: int = 100) -> str:
@@ -57,9 +68,8 @@ async def list_calendar_events(calendar_ids: Optional[List[str]] = None, start_t
     Returns:
         A JSON string representing a list of events.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "calendar", "v3", credentials=creds)
+        service = await get_service("calendar", "v3")
         
         # Use provided calendar IDs or defaults
         if calendar_ids is None:
@@ -68,34 +78,79 @@ async def list_calendar_events(calendar_ids: Optional[List[str]] = None, start_t
         # Validate calendar IDs
         validated_calendar_ids = validate_calendar_ids(calendar_ids)
         
-        all_events = []
-        
-        for calendar_id in validated_calendar_ids:
-            def _list_events():
-                events_result = service.events().list(
-                    calendarId=calendar_id,
-                    timeMin=start_time,
-                    timeMax=end_time,
-                    q=query,
-                    maxResults=max_results,
-                    singleEvents=True,
-                    orderBy="startTime"
-                ).execute()
-                return events_result.get("items", [])
+        def _events_request(calendar_id):
+            return service.events().list(
+                calendarId=calendar_id,
+                timeMin=start_time,
+                timeMax=end_time,
+                q=query,
+                maxResults=max_results,
+                singleEvents=True,
+                orderBy="startTime"
+            )
+        
+        def _list_events(calendar_id):
+            return _events_request(calendar_id).execute().get("items", [])
+        
+        def _list_events_batch(calendar_ids):
+            # Send one HTTP request for the whole group instead of one per calendar
+            responses = {}
+            
+            def _collect(calendar_id, response, exception):
+                responses[calendar_id] = exception if exception is not None else response.get("items", [])
             
-            events = await asyncio.to_thread(_list_events)
+            # Calendar IDs are unique after validation, so they double as batch request IDs
+            batch = service.new_batch_http_request(callback=_collect)
+            for calendar_id in calendar_ids:
+                batch.add(_events_request(calendar_id), request_id=calendar_id)
+            batch.execute()
+            return [responses.get(calendar_id, []) for calendar_id in calendar_ids]
+        
+        if len(validated_calendar_ids) == 1:
+            results = await asyncio.gather(
+                run_io(_list_events, validated_calendar_ids[0]),
+                return_exceptions=True
+            )
+        else:
+            # Batches run concurrently; one failing calendar does not abort the others
+            groups = [
+                validated_calendar_ids[i:i + _CALENDAR_BATCH_LIMIT]
+                for i in range(0, len(validated_calendar_ids), _CALENDAR_BATCH_LIMIT)
+            ]
+            group_results = await asyncio.gather(
+                *(run_io(_list_events_batch, group) for group in groups),
+                return_exceptions=True
+            )
+            results = []
+            for group, group_result in zip(groups, group_results):
+                if isinstance(group_result, BaseException):
+                    results.extend([group_result] * len(group))
+                else:
+                    results.extend(group_result)
+        
+        per_calendar_events = []
+        errors = []
+        
+        for calendar_id, events in zip(validated_calendar_ids, results):
+            if isinstance(events, HttpError):
+                logger.warning("Failed to list events for calendar %s: %s", calendar_id, events)
+                errors.append(events)
+                continue
+            if isinstance(events, BaseException):
+                raise events
             
             # Add calendar ID to each event
-            for event in events:
-                event["calendarId"] = calendar_id
-                all_events.append(event)
+            per_calendar_events.append([{**event, "calendarId": calendar_id} for event in events])
+        
+        if errors and len(errors) == len(validated_calendar_ids):
+            raise errors[0]
         
-        # Sort all events by start time
-        all_events.sort(key=lambda x: x.get("start", {}).get("dateTime", x.get("start", {}).get("date", "")))
+        # Each calendar's events are already ordered by start time, so merge them
+        all_events = list(heapq.merge(*per_calendar_events, key=_event_start_key))
         
-        return json.dumps(all_events)
+        return to_json(all_events)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def search_calendar_events(calendar_ids: Optional[List[str]] = None, query: str = None, start_time: str = None, end_time: str = None) -> str:
@@ -128,21 +183,20 @@ async def get_calendar_event_details(event_id: str, calendar_id: Optional[str] =
     Returns:
         A JSON string with event details.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "calendar", "v3", credentials=creds)
+        service = await get_service("calendar", "v3")
         
         # If no calendar_id provided, try default calendars
         if calendar_id is None:
             default_calendars = get_default_calendar_ids()
             if not default_calendars:
-                return json.dumps({"error": "No default calendars configured and no calendar_id provided"})
+                return to_json({"error": "No default calendars configured and no calendar_id provided"})
             calendar_id = default_calendars[0]  # Use first default calendar
         
         def _get_event_details():
             return service.events().get(calendarId=calendar_id, eventId=event_id).execute()
 
-        event = await asyncio.to_thread(_get_event_details)
-        return json.dumps(event)
+        event = await run_io(_get_event_details)
+        return to_json(event)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
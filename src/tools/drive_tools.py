@@ -1,80 +1,203 @@
-import json
 import asyncio
+import atexit
 import re
 import io
 import logging
-from typing import List, Dict, Optional, Tuple
-from googleapiclient.discovery import build
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, List, Dict, Optional, Tuple
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload
-import PyPDF2
 
-from src.auth import get_credentials
-from src.mcp_instance import mcp
-from src.config import get_supported_content_search_types, get_max_content_search_results, get_content_search_snippet_length
+from src.serialization import to_json
+from src.mcp_instance import mcp, get_service, run_io, gather_with_concurrency
+from src.config import (
+    get_supported_content_search_types,
+    get_max_content_search_results,
+    get_content_search_snippet_length,
+    get_content_search_concurrency,
+    get_content_search_max_snippets,
+    get_pdf_parse_workers,
+)
+from src.tools._content_cache import get_cached_content, set_cached_content
+from src.tools._query_cache import cache_key, get_cached_result, set_cached_result
+from src.tools._pdf import parse_pdf_bytes
 
 logger = logging.getLogger(__name__)
 
+# Metadata fields read by get_drive_file_details; "*" would also return
+# permissions, export links, thumbnails and more
+_FILE_DETAILS_FIELDS = "id, name, mimeType, createdTime, modifiedTime"
+
+# Media downloads fetch up to 8 MB per request instead of the 100 KB default,
+# so most files arrive in a single round trip
+_DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# How much of a text file is fetched for snippets when Drive's fullText
+# search has already established that it matches
+_TEXT_PREFIX_BYTES = 64 * 1024
+
+# PDF text extraction is pure Python and CPU-bound, so it runs in worker
+# processes instead of the I/O threads. The pool is created on first use.
+_PDF_POOL: Optional[ProcessPoolExecutor] = None
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _PDF_POOL
+    if _PDF_POOL is None:
+        # Workers are spawned rather than forked: by now the server runs the
+        # I/O thread pool and the event loop, and forking a threaded process
+        # can deadlock the child
+        _PDF_POOL = ProcessPoolExecutor(
+            max_workers=get_pdf_parse_workers(), mp_context=multiprocessing.get_context("spawn")
+        )
+    return _PDF_POOL
+
+def _reset_pdf_pool(pool: ProcessPoolExecutor) -> None:
+    """Discard a broken PDF pool so the next parse starts a fresh one."""
+    global _PDF_POOL
+    if _PDF_POOL is pool:
+        _PDF_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _shutdown_pdf_pool() -> None:
+    if _PDF_POOL is not None:
+        _PDF_POOL.shutdown(wait=False)
+
+atexit.register(_shutdown_pdf_pool)
+
+async def _parse_pdf(data: bytes) -> str:
+    """
+    Parse PDF bytes in the worker pool.
+    
+    If a worker has died (e.g. killed while parsing a malformed PDF), the pool
+    is broken for good, so it is replaced and the parse is retried once.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_pdf_pool()
+    try:
+        return await loop.run_in_executor(pool, parse_pdf_bytes, data)
+    except BrokenProcessPool:
+        logger.warning("PDF worker pool is broken; starting a new one")
+        _reset_pdf_pool(pool)
+        return await loop.run_in_executor(_get_pdf_pool(), parse_pdf_bytes, data)
+
+def _export_text(service, file_id: str) -> str:
+    """Export a Google Apps file as plain text (blocking)."""
+    request = service.files().export_media(fileId=file_id, mimeType="text/plain")
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request, chunksize=_DOWNLOAD_CHUNK_SIZE)
+    done = False
+    while not done:
+        _, done = downloader.next_chunk()
+    return fh.getvalue().decode('utf-8')
+
+async def _get_metadata_with_export(
+    service, file_id: str, fields: str, expected_mime_type: Optional[str] = None
+) -> Tuple[Dict, Optional[str]]:
+    """
+    Fetches file metadata, speculatively exporting the file as plain text
+    when the caller expects a Google Apps file.
+    
+    The export only succeeds for Google Docs/Sheets/Slides, but running it
+    alongside the metadata request saves a round trip for them. Every
+    export costs Drive quota, so it only runs when `expected_mime_type` is
+    a Google Apps type; otherwise just the metadata is fetched, and callers
+    export the file themselves once its type is known.
+    
+    Returns:
+        The file metadata, and the exported text if the file is a Google Apps
+        file and the speculative export succeeded (None otherwise).
+    """
+    def _get_metadata():
+        return service.files().get(fileId=file_id, fields=fields).execute()
+    
+    if "google-apps" not in (expected_mime_type or ""):
+        return await run_io(_get_metadata), None
+    
+    file_metadata, content = await asyncio.gather(
+        run_io(_get_metadata),
+        run_io(_export_text, service, file_id),
+        return_exceptions=True
+    )
+    if isinstance(file_metadata, BaseException):
+        raise file_metadata
+    if "google-apps" not in file_metadata.get("mimeType", "") or isinstance(content, BaseException):
+        content = None
+    return file_metadata, content
+
+def _q_escape(value: str) -> str:
+    """Escape a value for use inside a single-quoted string in a Drive `q` query."""
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+@lru_cache(maxsize=32)
+def _mime_type_query(file_types: Tuple[str, ...]) -> str:
+    """Build the MIME type filter for a Drive query; the default set is built only once."""
+    mime_type_query = " or ".join(f"mimeType = '{_q_escape(mime_type)}'" for mime_type in file_types)
+    return f"({mime_type_query})"
+
 @mcp.tool()
-async def search_drive(query: str) -> str:
+async def search_drive(query: str, no_cache: bool = False) -> str:
     """
     Searches for files in Google Drive matching the query.
 
     Args:
         query: The search string.
+        no_cache: Skip the short-lived cache of identical searches (default: False).
 
     Returns:
         A JSON string representing a list of files.
     """
-    creds = await asyncio.to_thread(get_credentials)
+    key = cache_key("search_drive", query)
+    if not no_cache:
+        cached = get_cached_result(key)
+        if cached is not None:
+            return cached
+    
     try:
-        service = await asyncio.to_thread(build, "drive", "v3", credentials=creds)
+        service = await get_service("drive", "v3")
         
         def _search():
             return service.files().list(
                 q=query, pageSize=10, fields="files(id, name, mimeType)"
             ).execute()
 
-        results = await asyncio.to_thread(_search)
+        results = await run_io(_search)
         items = results.get("files", [])
-        return json.dumps(items)
+        result = to_json(items)
+        set_cached_result(key, result)
+        return result
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
-async def get_drive_file_details(file_id: str) -> str:
+async def get_drive_file_details(file_id: str, verbose: bool = False, mime_type: Optional[str] = None) -> str:
     """
     Fetches the metadata and content of a specific file by its ID.
     For Google Docs/Sheets/Slides, it exports the content as plain text.
 
     Args:
         file_id: The unique ID of the file.
+        verbose: Also return every metadata field Drive has for the file,
+            under "metadata" (default: False).
+        mime_type: The file's MIME type, if already known (e.g. from
+            search_drive). Google Apps files are then exported alongside the
+            metadata request, saving a round trip (optional).
 
     Returns:
         A JSON string with file details.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "drive", "v3", credentials=creds)
-
-        def _get_metadata():
-            return service.files().get(fileId=file_id, fields="*").execute()
+        service = await get_service("drive", "v3")
 
-        file_metadata = await asyncio.to_thread(_get_metadata)
+        fields = "*" if verbose else _FILE_DETAILS_FIELDS
+        file_metadata, content = await _get_metadata_with_export(service, file_id, fields, mime_type)
         mime_type = file_metadata.get("mimeType")
-        content = None
 
-        if "google-apps" in mime_type:
-            def _export():
-                request = service.files().export_media(fileId=file_id, mimeType="text/plain")
-                fh = io.BytesIO()
-                downloader = MediaIoBaseDownload(fh, request)
-                done = False
-                while not done:
-                    _, done = downloader.next_chunk()
-                return fh.getvalue().decode()
-            
-            content = await asyncio.to_thread(_export)
+        if "google-apps" in (mime_type or "") and content is None:
+            # Export now, or retry a failed speculative export so its error is reported
+            content = await run_io(_export_text, service, file_id)
 
         file_details = {
             "id": file_metadata.get("id"),
@@ -84,9 +207,11 @@ async def get_drive_file_details(file_id: str) -> str:
             "modifiedTime": file_metadata.get("modifiedTime"),
             "content": content,
         }
-        return json.dumps(file_details)
+        if verbose:
+            file_details["metadata"] = file_metadata
+        return to_json(file_details)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def search_drive_by_content(
@@ -95,7 +220,9 @@ async def search_drive_by_content(
     file_types: Optional[List[str]] = None,
     case_sensitive: bool = False,
     use_regex: bool = False,
-    max_results: Optional[int] = None
+    max_results: Optional[int] = None,
+    search_terms: Optional[List[str]] = None,
+    no_cache: bool = False
 ) -> str:
     """
     Searches for files in Google Drive containing the specified text content.
@@ -107,12 +234,17 @@ async def search_drive_by_content(
         case_sensitive: Whether to perform case-sensitive search
         use_regex: Whether to treat search_term as a regex pattern
         max_results: Maximum number of results to return (defaults to config)
+        search_terms: Optional additional terms; files containing search_term
+            or any of these match, and each file is scanned once for all of them
+        no_cache: Skip the short-lived cache of identical searches (default: False)
         
     Returns:
         A JSON string with search results including file metadata and content snippets
     """
     if not search_term.strip():
-        return json.dumps({"error": "Search term cannot be empty"})
+        return to_json({"error": "Search term cannot be empty"})
+    
+    extra_terms = tuple(term for term in search_terms or () if term.strip())
     
     if max_results is None:
         max_results = get_max_content_search_results()
@@ -120,31 +252,44 @@ async def search_drive_by_content(
     if file_types is None:
         file_types = get_supported_content_search_types()
     
-    creds = await asyncio.to_thread(get_credentials)
+    key = cache_key(
+        "search_drive_by_content", search_term, folder_id, file_types,
+        case_sensitive, use_regex, max_results, extra_terms
+    )
+    if not no_cache:
+        cached = get_cached_result(key)
+        if cached is not None:
+            return cached
+    
     try:
-        service = await asyncio.to_thread(build, "drive", "v3", credentials=creds)
+        service = await get_service("drive", "v3")
         
         # Build search query
         query_parts = []
         
         # Add full-text search
-        if use_regex:
-            # For regex, we'll need to search more broadly and filter later
-            query_parts.append(f"fullText contains '{search_term}'")
-        else:
-            if case_sensitive:
-                query_parts.append(f"fullText contains '{search_term}'")
+        full_text_parts = []
+        for term in (search_term, *extra_terms):
+            if use_regex:
+                # For regex, we'll need to search more broadly and filter later
+                full_text_parts.append(f"fullText contains '{_q_escape(term)}'")
             else:
-                query_parts.append(f"fullText contains '{search_term.lower()}'")
+                if case_sensitive:
+                    full_text_parts.append(f"fullText contains '{_q_escape(term)}'")
+                else:
+                    full_text_parts.append(f"fullText contains '{_q_escape(term.lower())}'")
+        if len(full_text_parts) == 1:
+            query_parts.append(full_text_parts[0])
+        else:
+            query_parts.append(f"({' or '.join(full_text_parts)})")
         
         # Add file type filter
         if file_types:
-            mime_type_query = " or ".join([f"mimeType = '{mime_type}'" for mime_type in file_types])
-            query_parts.append(f"({mime_type_query})")
+            query_parts.append(_mime_type_query(tuple(file_types)))
         
         # Add folder filter
         if folder_id:
-            query_parts.append(f"'{folder_id}' in parents")
+            query_parts.append(f"'{_q_escape(folder_id)}' in parents")
         
         query = " and ".join(query_parts)
         
@@ -155,17 +300,29 @@ async def search_drive_by_content(
                 fields="files(id, name, mimeType, createdTime, modifiedTime, size, parents)"
             ).execute()
         
-        results = await asyncio.to_thread(_search)
+        results = await run_io(_search)
         files = results.get("files", [])
         
+        # Drive's fullText search is a case-insensitive plain-text match, so for
+        # such searches its results need no local confirmation
+        trust_server_match = not use_regex and not case_sensitive
+        
+        # Extract content from several files at once, bounded to stay within Drive rate limits
+        content_infos = await gather_with_concurrency(
+            get_content_search_concurrency(),
+            *(
+                _extract_file_content_for_search(
+                    service, file["id"], file["mimeType"], search_term, 
+                    case_sensitive, use_regex, modified_time=file.get("modifiedTime"),
+                    trust_server_match=trust_server_match, search_terms=extra_terms
+                )
+                for file in files
+            )
+        )
+        
         # Process results and extract content snippets
         search_results = []
-        for file in files:
-            content_info = await _extract_file_content_for_search(
-                service, file["id"], file["mimeType"], search_term, 
-                case_sensitive, use_regex
-            )
-            
+        for file, content_info in zip(files, content_infos):
             if content_info["has_matches"]:
                 search_results.append({
                     "id": file["id"],
@@ -179,46 +336,76 @@ async def search_drive_by_content(
                     "match_count": content_info["match_count"]
                 })
         
-        return json.dumps({
+        result = to_json({
             "results": search_results,
             "total_matches": len(search_results),
             "search_term": search_term,
             "query": query
         })
+        set_cached_result(key, result)
+        return result
         
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 async def _extract_file_content_for_search(
     service, file_id: str, mime_type: str, search_term: str, 
-    case_sensitive: bool, use_regex: bool
+    case_sensitive: bool, use_regex: bool, modified_time: Optional[str] = None,
+    content: Optional[str] = None, trust_server_match: bool = False,
+    search_terms: Tuple[str, ...] = ()
 ) -> Dict:
     """
     Extracts content from a file and searches for matches.
     
+    Text extracted from a file revision is cached on disk, keyed by file ID
+    and `modified_time`, so repeat searches skip the download and parsing.
+    Callers that already hold the file's text can pass it as `content`.
+    
+    With `trust_server_match`, the file is known to match already (Drive's
+    fullText index returned it), so uncached text files are not downloaded
+    in full: only a prefix is fetched to build snippets, and `match_count`
+    counts the matches within that prefix. If the prefix holds no match, the
+    file is downloaded and searched in full. `search_terms` are extra terms
+    matched alongside `search_term`.
+    
     Returns:
         Dict with has_matches, snippets, and match_count
     """
     try:
-        content = None
-        
-        # Handle Google Apps files
-        if "google-apps" in mime_type:
-            content = await _extract_google_apps_content(service, file_id)
-        
-        # Handle PDF files
-        elif mime_type == "application/pdf":
-            content = await _extract_pdf_content(service, file_id)
-        
-        # Handle text files
-        elif mime_type.startswith("text/"):
-            content = await _extract_text_content(service, file_id)
+        if content is None:
+            content = await run_io(get_cached_content, file_id, modified_time)
+        
+        if content is None and trust_server_match and mime_type.startswith("text/"):
+            prefix = await _extract_text_prefix(service, file_id) or ""
+            matches = _find_content_matches(prefix, search_term, case_sensitive, use_regex, search_terms)
+            if matches:
+                return {
+                    "has_matches": True,
+                    "snippets": _generate_search_snippets(prefix, matches, get_content_search_snippet_length()),
+                    "match_count": len(matches)
+                }
+        
+        if content is None:
+            # Handle Google Apps files
+            if "google-apps" in mime_type:
+                content = await _extract_google_apps_content(service, file_id)
+            
+            # Handle PDF files
+            elif mime_type == "application/pdf":
+                content = await _extract_pdf_content(service, file_id)
+            
+            # Handle text files
+            elif mime_type.startswith("text/"):
+                content = await _extract_text_content(service, file_id)
+            
+            if content is not None:
+                await run_io(set_cached_content, file_id, modified_time, content)
         
         if not content:
             return {"has_matches": False, "snippets": [], "match_count": 0}
         
         # Search for matches
-        matches = _find_content_matches(content, search_term, case_sensitive, use_regex)
+        matches = _find_content_matches(content, search_term, case_sensitive, use_regex, search_terms)
         
         if not matches:
             return {"has_matches": False, "snippets": [], "match_count": 0}
@@ -239,16 +426,7 @@ async def _extract_file_content_for_search(
 async def _extract_google_apps_content(service, file_id: str) -> Optional[str]:
     """Extract content from Google Apps files."""
     try:
-        def _export():
-            request = service.files().export_media(fileId=file_id, mimeType="text/plain")
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                _, done = downloader.next_chunk()
-            return fh.getvalue().decode('utf-8')
-        
-        return await asyncio.to_thread(_export)
+        return await run_io(_export_text, service, file_id)
     except Exception as e:
         logger.error(f"Error extracting Google Apps content: {e}")
         return None
@@ -256,23 +434,19 @@ async def _extract_google_apps_content(service, file_id: str) -> Optional[str]:
 async def _extract_pdf_content(service, file_id: str) -> Optional[str]:
     """Extract text content from PDF files."""
     try:
-        def _download_and_extract():
+        def _download():
             request = service.files().get_media(fileId=file_id)
             fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
+            downloader = MediaIoBaseDownload(fh, request, chunksize=_DOWNLOAD_CHUNK_SIZE)
             done = False
             while not done:
                 _, done = downloader.next_chunk()
-            
-            # Extract text from PDF
-            fh.seek(0)
-            pdf_reader = PyPDF2.PdfReader(fh)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-        
-        return await asyncio.to_thread(_download_and_extract)
+            return fh.getvalue()
+        
+        data = await run_io(_download)
+        
+        # Extract text from PDF
+        return await _parse_pdf(data)
     except Exception as e:
         logger.error(f"Error extracting PDF content: {e}")
         return None
@@ -283,83 +457,227 @@ async def _extract_text_content(service, file_id: str) -> Optional[str]:
         def _download():
             request = service.files().get_media(fileId=file_id)
             fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
+            downloader = MediaIoBaseDownload(fh, request, chunksize=_DOWNLOAD_CHUNK_SIZE)
             done = False
             while not done:
                 _, done = downloader.next_chunk()
             return fh.getvalue().decode('utf-8')
         
-        return await asyncio.to_thread(_download)
+        return await run_io(_download)
     except Exception as e:
         logger.error(f"Error extracting text content: {e}")
         return None
 
-def _find_content_matches(content: str, search_term: str, case_sensitive: bool, use_regex: bool) -> List[Tuple[int, int]]:
+async def _extract_text_prefix(service, file_id: str) -> Optional[str]:
+    """Extract the first _TEXT_PREFIX_BYTES of a text file using a Range request."""
+    try:
+        def _download_prefix():
+            request = service.files().get_media(fileId=file_id)
+            request.headers["Range"] = f"bytes=0-{_TEXT_PREFIX_BYTES - 1}"
+            # The prefix may end mid-character
+            return request.execute().decode('utf-8', errors='ignore')
+        
+        return await run_io(_download_prefix)
+    except Exception as e:
+        logger.error("Error extracting text prefix: %s", e)
+        return None
+
+@lru_cache(maxsize=256)
+def _compile(pattern: str, flags: int) -> "re.Pattern":
+    """Compile a search pattern once and reuse it across files and searches."""
+    return re.compile(pattern, flags)
+
+@lru_cache(maxsize=256)
+def _compile_user_regex(pattern: str, flags: int) -> Optional[Any]:
     """
-    Find all matches of search_term in content.
+    Compile a user-supplied regex, or return None if it is invalid.
     
-    Returns:
-        List of (start_pos, end_pos) tuples
+    Uses the linear-time RE2 engine when google-re2 is installed, so hostile
+    patterns like `(a+)+b` cannot stall a search. Patterns RE2 does not
+    support (backreferences, lookarounds) fall back to `re`. Invalid
+    patterns are cached too.
     """
-    matches = []
+    try:
+        import re2
+    except ImportError:
+        re2 = None
     
-    if use_regex:
+    if re2 is not None:
         try:
-            flags = 0 if case_sensitive else re.IGNORECASE
-            pattern = re.compile(search_term, flags)
-            for match in pattern.finditer(content):
-                matches.append((match.start(), match.end()))
-        except re.error:
-            # If regex is invalid, fall back to simple string search
-            return _find_content_matches(content, search_term, case_sensitive, False)
-    else:
-        search_text = search_term if case_sensitive else search_term.lower()
-        content_text = content if case_sensitive else content.lower()
-        
-        start = 0
-        while True:
-            pos = content_text.find(search_text, start)
-            if pos == -1:
-                break
-            matches.append((pos, pos + len(search_term)))
-            start = pos + 1
-    
-    return matches
-
-def _generate_search_snippets(content: str, matches: List[Tuple[int, int]], snippet_length: int) -> List[Dict]:
+            return re2.compile(f"(?i){pattern}" if flags & re.IGNORECASE else pattern)
+        except re2.error:
+            pass
+    
+    try:
+        return re.compile(pattern, flags)
+    except re.error:
+        return None
+
+def _fold_case(text: str) -> str:
+    """
+    Lowercase text without changing its length, so match offsets in the
+    result are offsets in `text`.
+    
+    str.lower() expands a few characters (e.g. "İ" becomes "i̇"); those are
+    folded to the first character of their lowercase form instead.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(char.lower()[0] for char in text)
+
+@lru_cache(maxsize=64)
+def _build_automaton(terms: Tuple[str, ...], case_sensitive: bool) -> Optional[Any]:
+    """
+    Build an Aho-Corasick automaton for plain-text terms, if pyahocorasick is installed.
+    
+    Returns:
+        The automaton, or None when the optional dependency is missing.
+    """
+    try:
+        import ahocorasick
+    except ImportError:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for term in terms:
+        key = term if case_sensitive else _fold_case(term)
+        automaton.add_word(key, key)
+    automaton.make_automaton()
+    return automaton
+
+def _find_content_matches(
+    content: str, search_term: str, case_sensitive: bool, use_regex: bool, search_terms: Tuple[str, ...] = ()
+) -> List[Tuple[int, int]]:
+    """
+    Find all matches of search_term (and any additional search_terms) in content.
+    
+    Returns:
+        List of (start_pos, end_pos) tuples, ordered by start position
+    """
+    if search_terms:
+        return _find_multi_term_matches(content, (search_term, *search_terms), case_sensitive, use_regex)
+    
+    flags = 0 if case_sensitive else re.IGNORECASE
+    
+    # Plain-text terms are escaped and run through the same regex engine, so
+    # case-insensitive search needs no lowered copy of the content
+    # If regex is invalid, fall back to simple string search
+    pattern = _compile_user_regex(search_term, flags) if use_regex else None
+    if pattern is None:
+        pattern = _compile(re.escape(search_term), flags)
+    
+    return [(match.start(), match.end()) for match in pattern.finditer(content)]
+
+def _find_multi_term_matches(
+    content: str, terms: Tuple[str, ...], case_sensitive: bool, use_regex: bool
+) -> List[Tuple[int, int]]:
+    """
+    Find matches of any of several terms in a single pass over content.
+    
+    Plain-text terms use an Aho-Corasick automaton when pyahocorasick is
+    installed, and otherwise a single regex alternation. Both report the
+    same matches: leftmost-longest and non-overlapping.
+    
+    Returns:
+        List of (start_pos, end_pos) tuples, ordered by start position
+    """
+    flags = 0 if case_sensitive else re.IGNORECASE
+    
+    # If any regex is invalid, fall back to simple string search
+    pattern = _compile_user_regex("|".join(f"(?:{term})" for term in terms), flags) if use_regex else None
+    
+    if pattern is None:
+        automaton = _build_automaton(terms, case_sensitive)
+        if automaton is not None:
+            haystack = content if case_sensitive else _fold_case(content)
+            found = sorted(
+                ((end - len(key) + 1, end + 1) for end, key in automaton.iter(haystack)),
+                key=lambda match: (match[0], -match[1])
+            )
+            # The automaton reports every occurrence; keep the longest match
+            # at each start and drop matches overlapping an earlier one, as the
+            # regex alternation does
+            matches = []
+            last_end = 0
+            for start, end in found:
+                if start >= last_end:
+                    matches.append((start, end))
+                    last_end = end
+            return matches
+        
+        # Longest first, so a term that is a prefix of another does not shadow it
+        alternatives = sorted(terms, key=len, reverse=True)
+        pattern = _compile("|".join(re.escape(term) for term in alternatives), flags)
+    
+    return [(match.start(), match.end()) for match in pattern.finditer(content)]
+
+def _generate_search_snippets(
+    content: str, matches: List[Tuple[int, int]], snippet_length: int, max_snippets: Optional[int] = None
+) -> List[Dict]:
     """
     Generate snippets around matches for display.
     
+    Matches whose windows overlap are merged into one snippet spanning them,
+    as long as it stays within the length of a single snippet window; its
+    match positions refer to the first match. Past that, a new snippet starts
+    where the previous one ends, so dense matches do not chain into one
+    snippet covering the whole file. At most `max_snippets` snippets are
+    built (defaults to config), so files with thousands of matches do not
+    allocate a substring per match.
+    
     Returns:
         List of snippet dictionaries with text and match positions
     """
-    snippets = []
+    if max_snippets is None:
+        max_snippets = get_content_search_max_snippets()
+    
+    # [snippet_start, snippet_end, match_start, match_end] per snippet; the
+    # text is sliced once at the end, not again each time a snippet grows
+    spans = []
     half_length = snippet_length // 2
+    content_length = len(content)
     
     for start, end in matches:
         # Calculate snippet boundaries
         snippet_start = max(0, start - half_length)
-        snippet_end = min(len(content), end + half_length)
-        
-        # Extract snippet text
-        snippet_text = content[snippet_start:snippet_end]
-        
-        # Adjust match positions relative to snippet
-        match_start = start - snippet_start
-        match_end = end - snippet_start
-        
-        snippets.append({
-            "text": snippet_text,
-            "match_start": match_start,
-            "match_end": match_end,
+        snippet_end = min(content_length, end + half_length)
+        
+        if spans and snippet_start < spans[-1][1]:
+            previous = spans[-1]
+            # Extend the previous snippet instead of repeating overlapping
+            # text, but no further than one snippet window
+            if snippet_end - previous[0] <= snippet_length + (previous[3] - previous[2]):
+                previous[1] = max(previous[1], snippet_end)
+                continue
+            # The match is already shown in the previous snippet
+            if end <= previous[1]:
+                continue
+            # Otherwise start a new snippet where the previous one ends
+            snippet_start = min(start, previous[1])
+        
+        if len(spans) >= max_snippets:
+            break
+        
+        spans.append([snippet_start, snippet_end, start, end])
+    
+    # Match positions are reported relative to the snippet and to the content
+    return [
+        {
+            "text": content[snippet_start:snippet_end],
+            "match_start": start - snippet_start,
+            "match_end": end - snippet_start,
             "original_start": start,
             "original_end": end
-        })
-    
-    return snippets
+        }
+        for snippet_start, snippet_end, start, end in spans
+    ]
 
 @mcp.tool()
-async def search_within_file_content(file_id: str, search_term: str, case_sensitive: bool = False, use_regex: bool = False) -> str:
+async def search_within_file_content(
+    file_id: str, search_term: str, case_sensitive: bool = False, use_regex: bool = False,
+    mime_type: Optional[str] = None
+) -> str:
     """
     Search for specific content within a single file.
     
@@ -368,30 +686,32 @@ async def search_within_file_content(file_id: str, search_term: str, case_sensit
         search_term: The text to search for
         case_sensitive: Whether to perform case-sensitive search
         use_regex: Whether to treat search_term as a regex pattern
+        mime_type: The file's MIME type, if already known; Google Apps files
+            are then exported alongside the metadata request (optional)
         
     Returns:
         JSON string with search results for the specific file
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "drive", "v3", credentials=creds)
-        
-        # Get file metadata
-        def _get_metadata():
-            return service.files().get(fileId=file_id, fields="id, name, mimeType, createdTime, modifiedTime, size").execute()
+        service = await get_service("drive", "v3")
         
-        file_metadata = await asyncio.to_thread(_get_metadata)
+        # Get file metadata, exporting expected Google Apps files at the same time
+        file_metadata, content = await _get_metadata_with_export(
+            service, file_id, "id, name, mimeType, createdTime, modifiedTime, size", mime_type
+        )
+        mime_type = file_metadata.get("mimeType", "")
         
         # Extract and search content
         content_info = await _extract_file_content_for_search(
-            service, file_id, file_metadata["mimeType"], search_term, 
-            case_sensitive, use_regex
+            service, file_id, mime_type, search_term, 
+            case_sensitive, use_regex, modified_time=file_metadata.get("modifiedTime"),
+            content=content
         )
         
         result = {
             "file_id": file_id,
             "file_name": file_metadata["name"],
-            "mime_type": file_metadata["mimeType"],
+            "mime_type": mime_type,
             "created_time": file_metadata.get("createdTime"),
             "modified_time": file_metadata.get("modifiedTime"),
             "size": file_metadata.get("size"),
@@ -400,7 +720,7 @@ async def search_within_file_content(file_id: str, search_term: str, case_sensit
             "snippets": content_info["snippets"]
         }
         
-        return json.dumps(result)
+        return to_json(result)
         
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
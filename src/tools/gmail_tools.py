@@ -1,15 +1,216 @@
-import json
-import base64
-import asyncio
-from typing import List, Optional
-from googleapiclient.discovery import build
+import binascii
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from googleapiclient.errors import HttpError
 
-from src.auth import get_credentials
-from src.mcp_instance import mcp
+from src.config import get_gmail_max_body_bytes, get_gmail_label_cache_ttl
+from src.serialization import to_json
+from src.mcp_instance import mcp, get_service, run_io, gather_with_concurrency
+from src.tools._query_cache import cache_key, get_cached_result, set_cached_result
+
+logger = logging.getLogger(__name__)
+
+# Headers shown in message listings; fetched with format="metadata" so the
+# message bodies are not downloaded
+_SUMMARY_HEADERS = ["Subject", "From", "Date"]
+# Partial response for message summaries: the metadata format still returns
+# size, history and thread fields the listings never show
+_SUMMARY_FIELDS = "id,snippet,labelIds,payload/headers"
+
+# Partial response for labels.list: the fields _label_to_dict reads
+_LABEL_FIELDS = "labels(id,name,type,messageListVisibility,labelListVisibility,messagesTotal,messagesUnread)"
+
+# messages.list only needs to return IDs; summaries are fetched separately
+_LIST_FIELDS = "messages(id)"
+
+# Partial response for message details: only the fields the tool reads, so
+# attachments and non-text parts are not sent
+_DETAILS_FIELDS = "id,snippet,labelIds,payload(headers,body/data,parts(mimeType,body/data))"
+
+# The Gmail API accepts at most 100 calls in a single batch request
+_GMAIL_BATCH_LIMIT = 100
+# Batch requests sent at once, kept low to stay within Gmail's per-user concurrency limit
+_GMAIL_BATCH_CONCURRENCY = 4
+
+# Last labels.list response as (client, expiry, labels). Labels rarely change,
+# so label listings and searches within GMAIL_LABEL_CACHE_TTL_SECONDS reuse it
+_LABELS_CACHE: Optional[Tuple[Any, float, List[Dict]]] = None
+
+def _invalidate_labels_cache() -> None:
+    """
+    Drops the cached label list; call after any tool that changes labels.
+    """
+    global _LABELS_CACHE
+    _LABELS_CACHE = None
+
+async def _list_labels(service) -> List[Dict]:
+    """
+    Returns the user's labels, reusing a recent labels.list response.
+    
+    Args:
+        service: The Gmail API client.
+        
+    Returns:
+        The label resources from labels.list.
+    """
+    global _LABELS_CACHE
+    cached = _LABELS_CACHE
+    # Keyed on the client so labels of replaced credentials are never served
+    if cached is not None and cached[0] is service and time.monotonic() < cached[1]:
+        return cached[2]
+    
+    def _get_labels():
+        return service.users().labels().list(userId="me", fields=_LABEL_FIELDS).execute()
+    
+    result = await run_io(_get_labels)
+    labels = result.get("labels", [])
+    ttl = get_gmail_label_cache_ttl()
+    if ttl > 0:
+        _LABELS_CACHE = (service, time.monotonic() + ttl, labels)
+    return labels
+
+def _label_to_dict(label: Dict) -> Dict:
+    """
+    Converts a label resource to the summary returned by the label tools.
+    
+    Args:
+        label: A label resource from labels.list or labels.get.
+        
+    Returns:
+        The label's ID, name, type and visibility, plus message counts if present.
+    """
+    label_info = {
+        "id": label["id"],
+        "name": label["name"],
+        "type": label.get("type", "user"),
+        "messageListVisibility": label.get("messageListVisibility", "show"),
+        "labelListVisibility": label.get("labelListVisibility", "labelShow")
+    }
+    
+    # Add message count if available
+    if "messagesTotal" in label:
+        label_info["messagesTotal"] = label["messagesTotal"]
+    if "messagesUnread" in label:
+        label_info["messagesUnread"] = label["messagesUnread"]
+    return label_info
+
+_B64_URLSAFE_TO_STD = bytes.maketrans(b"-_", b"+/")
+
+def _decode_body(body_data: Optional[str], max_bytes: int) -> Tuple[str, bool]:
+    """
+    Decodes a base64url message body, decoding at most `max_bytes` of it.
+    
+    The encoded data is cut before decoding (every 4 base64 characters hold
+    3 bytes), so long bodies are never decoded in full.
+    
+    Args:
+        body_data: The base64url-encoded body, or None.
+        max_bytes: Maximum number of decoded bytes to keep; 0 keeps everything.
+        
+    Returns:
+        The decoded text, and whether it was truncated.
+    """
+    if not body_data:
+        return "", False
+    
+    truncated = False
+    if max_bytes > 0:
+        max_chars = -(-max_bytes // 3) * 4
+        if len(body_data) > max_chars:
+            body_data = body_data[:max_chars]
+            truncated = True
+    
+    # Map the URL-safe alphabet onto the standard one and restore any stripped
+    # padding, then decode in a single C call
+    raw = body_data.encode("ascii").translate(_B64_URLSAFE_TO_STD)
+    decoded = binascii.a2b_base64(raw + b"=" * (-len(raw) % 4))
+    if truncated:
+        # The cut may fall inside a multi-byte character
+        return decoded[:max_bytes].decode("utf-8", errors="ignore"), True
+    return decoded.decode("utf-8"), False
+
+async def _get_message_summaries(service, messages: List[Dict]) -> List[Dict]:
+    """
+    Fetches the summary headers for several messages in batched requests.
+    
+    Args:
+        service: The Gmail API client.
+        messages: Message stubs (with an "id") as returned by messages().list.
+        
+    Returns:
+        A list of message summaries in the same order as `messages`. Messages
+        that could not be fetched are left out.
+    """
+    def _get_messages_batch(message_ids):
+        # One HTTP request for the whole group instead of one per message
+        responses = {}
+        
+        def _collect(message_id, response, exception):
+            responses[message_id] = exception if exception is not None else response
+        
+        batch = service.new_batch_http_request(callback=_collect)
+        for message_id in message_ids:
+            batch.add(
+                service.users().messages().get(
+                    userId="me", id=message_id, format="metadata", metadataHeaders=_SUMMARY_HEADERS,
+                    fields=_SUMMARY_FIELDS
+                ),
+                request_id=message_id
+            )
+        batch.execute()
+        return [responses.get(message_id) for message_id in message_ids]
+    
+    message_ids = [msg["id"] for msg in messages]
+    groups = [
+        message_ids[i:i + _GMAIL_BATCH_LIMIT]
+        for i in range(0, len(message_ids), _GMAIL_BATCH_LIMIT)
+    ]
+    group_results = await gather_with_concurrency(
+        _GMAIL_BATCH_CONCURRENCY,
+        *(run_io(_get_messages_batch, group) for group in groups),
+        return_exceptions=True
+    )
+    results = []
+    for group, group_result in zip(groups, group_results):
+        if isinstance(group_result, BaseException):
+            results.extend([group_result] * len(group))
+        else:
+            results.extend(group_result)
+    
+    message_list = []
+    errors = []
+    for msg, msg_data in zip(messages, results):
+        if isinstance(msg_data, HttpError):
+            logger.warning("Failed to fetch message %s: %s", msg["id"], msg_data)
+            errors.append(msg_data)
+            continue
+        if isinstance(msg_data, BaseException):
+            raise msg_data
+        if msg_data is None:
+            continue
+        
+        # The fields mask drops the payload of a message with none of the requested headers
+        headers = {h["name"]: h["value"] for h in msg_data.get("payload", {}).get("headers", [])}
+        
+        message_list.append({
+            "id": msg_data["id"],
+            "subject": headers.get("Subject", ""),
+            "from": headers.get("From", ""),
+            "date": headers.get("Date", ""),
+            "labels": msg_data.get("labelIds", []),
+            "snippet": msg_data.get("snippet", "")
+        })
+    
+    if errors and len(errors) == len(messages):
+        raise errors[0]
+    
+    return message_list
 
 @mcp.tool()
-async def search_gmail(query: str, label_ids: Optional[List[str]] = None, max_results: int = 10) -> str:
+async def search_gmail(query: str, label_ids: Optional[List[str]] = None, max_results: int = 10,
+                       ids_only: bool = False, no_cache: bool = False) -> str:
     """
     Searches for emails in Gmail matching the query, optionally within specific labels.
 
@@ -17,55 +218,48 @@ async def search_gmail(query: str, label_ids: Optional[List[str]] = None, max_re
         query: The search string.
         label_ids: Optional list of label IDs to search within.
         max_results: Maximum number of results to return (default: 10).
+        ids_only: Return only message IDs, skipping the per-message metadata fetch (default: False).
+        no_cache: Skip the short-lived cache of identical searches (default: False).
 
     Returns:
         A JSON string representing a list of email messages.
     """
-    creds = await asyncio.to_thread(get_credentials)
+    key = cache_key("search_gmail", query, label_ids, max_results, ids_only)
+    if not no_cache:
+        cached = get_cached_result(key)
+        if cached is not None:
+            return cached
+    
     try:
-        service = await asyncio.to_thread(build, "gmail", "v1", credentials=creds)
+        service = await get_service("gmail", "v1")
 
         def _search():
-            search_params = {"userId": "me", "q": query, "maxResults": max_results}
+            search_params = {"userId": "me", "q": query, "maxResults": max_results, "fields": _LIST_FIELDS}
             if label_ids:
                 search_params["labelIds"] = label_ids
             return service.users().messages().list(**search_params).execute()
 
-        result = await asyncio.to_thread(_search)
+        result = await run_io(_search)
         messages = result.get("messages", [])
         
-        message_list = []
-        for msg in messages:
-            def _get_message():
-                return service.users().messages().get(userId="me", id=msg["id"]).execute()
-            
-            msg_data = await asyncio.to_thread(_get_message)
-            headers = msg_data["payload"]["headers"]
-            
-            subject = next((h["value"] for h in headers if h["name"] == "Subject"), "")
-            from_email = next((h["value"] for h in headers if h["name"] == "From"), "")
-            date = next((h["value"] for h in headers if h["name"] == "Date"), "")
-            
-            # Extract labels
-            labels = msg_data.get("labelIds", [])
-
-            message_list.append({
-                "id": msg_data["id"],
-                "subject": subject,
-                "from": from_email,
-                "date": date,
-                "labels": labels,
-                "snippet": msg_data.get("snippet", "")
-            })
+        if ids_only:
+            message_list = [{"id": msg["id"]} for msg in messages]
+        else:
+            message_list = await _get_message_summaries(service, messages)
             
-        return json.dumps({
+        serialized = to_json({
             "messages": message_list,
             "total_results": len(message_list),
             "query": query,
             "label_ids": label_ids
         })
+        # Messages that could not be fetched are left out; don't keep serving
+        # that partial result once the failure clears
+        if len(message_list) == len(messages):
+            set_cached_result(key, serialized)
+        return serialized
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def list_gmail_labels() -> str:
@@ -75,40 +269,18 @@ async def list_gmail_labels() -> str:
     Returns:
         A JSON string representing a list of Gmail labels.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "gmail", "v1", credentials=creds)
-
-        def _get_labels():
-            return service.users().labels().list(userId="me").execute()
-
-        result = await asyncio.to_thread(_get_labels)
-        labels = result.get("labels", [])
+        service = await get_service("gmail", "v1")
+        labels = await _list_labels(service)
         
-        label_list = []
-        for label in labels:
-            label_info = {
-                "id": label["id"],
-                "name": label["name"],
-                "type": label.get("type", "user"),
-                "messageListVisibility": label.get("messageListVisibility", "show"),
-                "labelListVisibility": label.get("labelListVisibility", "labelShow")
-            }
+        label_list = [_label_to_dict(label) for label in labels]
             
-            # Add message count if available
-            if "messagesTotal" in label:
-                label_info["messagesTotal"] = label["messagesTotal"]
-            if "messagesUnread" in label:
-                label_info["messagesUnread"] = label["messagesUnread"]
-                
-            label_list.append(label_info)
-            
-        return json.dumps({
+        return to_json({
             "labels": label_list,
             "total_labels": len(label_list)
         })
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def search_gmail_labels(query: str = "") -> str:
@@ -121,51 +293,27 @@ async def search_gmail_labels(query: str = "") -> str:
     Returns:
         A JSON string representing a list of matching Gmail labels.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "gmail", "v1", credentials=creds)
-
-        def _get_labels():
-            return service.users().labels().list(userId="me").execute()
-
-        result = await asyncio.to_thread(_get_labels)
-        all_labels = result.get("labels", [])
+        service = await get_service("gmail", "v1")
+        all_labels = await _list_labels(service)
         
         # Filter labels by query if provided
         if query:
-            query_lower = query.lower()
-            matching_labels = [
-                label for label in all_labels 
-                if query_lower in label["name"].lower()
-            ]
+            # A compiled case-insensitive search avoids lower-casing every label name
+            matches = re.compile(re.escape(query), re.IGNORECASE).search
+            matching_labels = [label for label in all_labels if matches(label["name"])]
         else:
             matching_labels = all_labels
         
-        label_list = []
-        for label in matching_labels:
-            label_info = {
-                "id": label["id"],
-                "name": label["name"],
-                "type": label.get("type", "user"),
-                "messageListVisibility": label.get("messageListVisibility", "show"),
-                "labelListVisibility": label.get("labelListVisibility", "labelShow")
-            }
-            
-            # Add message count if available
-            if "messagesTotal" in label:
-                label_info["messagesTotal"] = label["messagesTotal"]
-            if "messagesUnread" in label:
-                label_info["messagesUnread"] = label["messagesUnread"]
-                
-            label_list.append(label_info)
+        label_list = [_label_to_dict(label) for label in matching_labels]
             
-        return json.dumps({
+        return to_json({
             "labels": label_list,
             "total_labels": len(label_list),
             "query": query
         })
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def get_gmail_label_details(label_id: str) -> str:
@@ -178,39 +326,28 @@ async def get_gmail_label_details(label_id: str) -> str:
     Returns:
         A JSON string with label details.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "gmail", "v1", credentials=creds)
+        service = await get_service("gmail", "v1")
 
         def _get_label():
             return service.users().labels().get(userId="me", id=label_id).execute()
 
-        label_data = await asyncio.to_thread(_get_label)
+        label_data = await run_io(_get_label)
         
-        label_details = {
-            "id": label_data["id"],
-            "name": label_data["name"],
-            "type": label_data.get("type", "user"),
-            "messageListVisibility": label_data.get("messageListVisibility", "show"),
-            "labelListVisibility": label_data.get("labelListVisibility", "labelShow")
-        }
+        label_details = _label_to_dict(label_data)
         
-        # Add message counts if available
-        if "messagesTotal" in label_data:
-            label_details["messagesTotal"] = label_data["messagesTotal"]
-        if "messagesUnread" in label_data:
-            label_details["messagesUnread"] = label_data["messagesUnread"]
+        # Add thread counts if available
         if "threadsTotal" in label_data:
             label_details["threadsTotal"] = label_data["threadsTotal"]
         if "threadsUnread" in label_data:
             label_details["threadsUnread"] = label_data["threadsUnread"]
             
-        return json.dumps(label_details)
+        return to_json(label_details)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
-async def search_gmail_by_label(label_id: str, query: str = "", max_results: int = 10) -> str:
+async def search_gmail_by_label(label_id: str, query: str = "", max_results: int = 10, ids_only: bool = False) -> str:
     """
     Searches for emails within a specific Gmail label.
 
@@ -218,59 +355,41 @@ async def search_gmail_by_label(label_id: str, query: str = "", max_results: int
         label_id: The ID of the label to search within.
         query: Optional search string to filter messages.
         max_results: Maximum number of results to return (default: 10).
+        ids_only: Return only message IDs, skipping the per-message metadata fetch (default: False).
 
     Returns:
         A JSON string representing a list of email messages in the label.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "gmail", "v1", credentials=creds)
+        service = await get_service("gmail", "v1")
 
         def _search():
             search_params = {
                 "userId": "me", 
                 "labelIds": [label_id], 
-                "maxResults": max_results
+                "maxResults": max_results,
+                "fields": _LIST_FIELDS
             }
             if query:
                 search_params["q"] = query
             return service.users().messages().list(**search_params).execute()
 
-        result = await asyncio.to_thread(_search)
+        result = await run_io(_search)
         messages = result.get("messages", [])
         
-        message_list = []
-        for msg in messages:
-            def _get_message():
-                return service.users().messages().get(userId="me", id=msg["id"]).execute()
-            
-            msg_data = await asyncio.to_thread(_get_message)
-            headers = msg_data["payload"]["headers"]
-            
-            subject = next((h["value"] for h in headers if h["name"] == "Subject"), "")
-            from_email = next((h["value"] for h in headers if h["name"] == "From"), "")
-            date = next((h["value"] for h in headers if h["name"] == "Date"), "")
-            
-            # Extract all labels
-            labels = msg_data.get("labelIds", [])
-
-            message_list.append({
-                "id": msg_data["id"],
-                "subject": subject,
-                "from": from_email,
-                "date": date,
-                "labels": labels,
-                "snippet": msg_data.get("snippet", "")
-            })
+        if ids_only:
+            message_list = [{"id": msg["id"]} for msg in messages]
+        else:
+            message_list = await _get_message_summaries(service, messages)
             
-        return json.dumps({
+        return to_json({
             "messages": message_list,
             "total_results": len(message_list),
             "label_id": label_id,
             "query": query
         })
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def get_gmail_message_details(message_id: str) -> str:
@@ -283,36 +402,36 @@ async def get_gmail_message_details(message_id: str) -> str:
     Returns:
         A JSON string with email details.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "gmail", "v1", credentials=creds)
+        service = await get_service("gmail", "v1")
         
         def _get_details():
-            return service.users().messages().get(userId="me", id=message_id).execute()
-
-        msg_data = await asyncio.to_thread(_get_details)
-        headers = msg_data["payload"]["headers"]
-
-        subject = next((h["value"] for h in headers if h["name"] == "Subject"), "")
-        from_email = next((h["value"] for h in headers if h["name"] == "From"), "")
-        to_email = next((h["value"] for h in headers if h["name"] == "To"), "")
-        date = next((h["value"] for h in headers if h["name"] == "Date"), "")
+            return service.users().messages().get(
+                userId="me", id=message_id, format="full", fields=_DETAILS_FIELDS
+            ).execute()
+
+        msg_data = await run_io(_get_details)
+        payload = msg_data.get("payload", {})
+        headers = {h["name"]: h["value"] for h in payload.get("headers", [])}
+
+        subject = headers.get("Subject", "")
+        from_email = headers.get("From", "")
+        to_email = headers.get("To", "")
+        date = headers.get("Date", "")
         
         # Extract labels
         labels = msg_data.get("labelIds", [])
         
-        body = ""
-        if "parts" in msg_data["payload"]:
-            for part in msg_data["payload"]["parts"]:
-                if part["mimeType"] == "text/plain":
-                    body_data = part["body"].get("data")
-                    if body_data:
-                        body = base64.urlsafe_b64decode(body_data).decode("utf-8")
-                        break
+        # Partial responses omit empty objects, so a body without data may be missing
+        if "parts" in payload:
+            body_data = next(
+                (part["body"]["data"] for part in payload["parts"]
+                 if part["mimeType"] == "text/plain" and part.get("body", {}).get("data")),
+                None
+            )
         else:
-            body_data = msg_data["payload"]["body"].get("data")
-            if body_data:
-                body = base64.urlsafe_b64decode(body_data).decode("utf-8")
+            body_data = payload.get("body", {}).get("data")
+        body, body_truncated = _decode_body(body_data, get_gmail_max_body_bytes())
 
         message_details = {
             "id": msg_data["id"],
@@ -321,10 +440,11 @@ async def get_gmail_message_details(message_id: str) -> str:
             "to": to_email,
             "date": date,
             "body": body,
+            "body_truncated": body_truncated,
             "labels": labels,
             "snippet": msg_data.get("snippet", "")
         }
         
-        return json.dumps(message_details)
+        return to_json(message_details)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
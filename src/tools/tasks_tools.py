@@ -1,13 +1,48 @@
-import json
-import asyncio
+import logging
+import re
+import time
 from typing import List, Optional
-from datetime import datetime, date
-from googleapiclient.discovery import build
+from datetime import datetime, date, timezone
 from googleapiclient.errors import HttpError
 
-from src.auth import get_credentials
-from src.config import validate_task_list_id, get_default_task_list_id, get_default_task_max_results
-from src.mcp_instance import mcp
+from src.config import (
+    validate_task_list_id, get_default_task_list_id, get_default_task_max_results, get_max_task_search_results
+)
+from src.serialization import to_json
+from src.mcp_instance import mcp, get_service, run_io, gather_with_concurrency
+
+logger = logging.getLogger(__name__)
+
+# Task lists fetched at once by search_all_tasks
+_TASK_LIST_CONCURRENCY = 8
+
+# Largest page of task lists the Tasks API returns
+_TASK_LISTS_PAGE_SIZE = 100
+
+# RFC 3339 timestamp format; the Tasks API takes times in UTC
+_RFC3339_UTC = "%Y-%m-%dT%H:%M:%SZ"
+
+def _utc_timestamp() -> str:
+    """
+    Returns the current time as an RFC 3339 UTC timestamp.
+    """
+    return time.strftime(_RFC3339_UTC, time.gmtime())
+
+def _due_timestamp(due_date: str) -> str:
+    """
+    Converts an ISO 8601 due date to an RFC 3339 UTC timestamp.
+    
+    Datetimes with a UTC offset are converted to UTC; dates and naive
+    datetimes are taken as UTC. Raises ValueError for invalid input.
+    """
+    due_dt = datetime.fromisoformat(due_date)
+    if due_dt.tzinfo is not None:
+        due_dt = due_dt.astimezone(timezone.utc)
+    return due_dt.strftime(_RFC3339_UTC)
+
+# Calls per batch request, and batch requests sent at once, by mark_tasks_completed
+_TASKS_BATCH_LIMIT = 100
+_TASKS_BATCH_CONCURRENCY = 4
 
 @mcp.tool()
 async def list_task_lists() -> str:
@@ -17,14 +52,13 @@ async def list_task_lists() -> str:
     Returns:
         A JSON string representing a list of task lists.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "tasks", "v1", credentials=creds)
+        service = await get_service("tasks", "v1")
         
         def _list_task_lists():
             return service.tasklists().list().execute()
 
-        task_lists_result = await asyncio.to_thread(_list_task_lists)
+        task_lists_result = await run_io(_list_task_lists)
         task_lists = task_lists_result.get("items", [])
         
         # Extract relevant information
@@ -36,9 +70,9 @@ async def list_task_lists() -> str:
                 "updated": task_list.get("updated")
             })
         
-        return json.dumps(task_list_info)
+        return to_json(task_list_info)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def list_tasks(task_list_id: Optional[str] = None, max_results: Optional[int] = None) -> str:
@@ -52,9 +86,8 @@ async def list_tasks(task_list_id: Optional[str] = None, max_results: Optional[i
     Returns:
         A JSON string representing a list of tasks.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "tasks", "v1", credentials=creds)
+        service = await get_service("tasks", "v1")
         
         # Use provided task list ID or default
         if task_list_id is None:
@@ -75,16 +108,16 @@ async def list_tasks(task_list_id: Optional[str] = None, max_results: Optional[i
                 showHidden=False
             ).execute()
 
-        tasks_result = await asyncio.to_thread(_list_tasks)
+        tasks_result = await run_io(_list_tasks)
         tasks = tasks_result.get("items", [])
         
         # Add task list ID to each task
         for task in tasks:
             task["taskListId"] = validated_task_list_id
         
-        return json.dumps(tasks)
+        return to_json(tasks)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def search_tasks(query: str, task_list_id: Optional[str] = None, max_results: Optional[int] = None) -> str:
@@ -99,9 +132,8 @@ async def search_tasks(query: str, task_list_id: Optional[str] = None, max_resul
     Returns:
         A JSON string representing a list of matching tasks.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "tasks", "v1", credentials=creds)
+        service = await get_service("tasks", "v1")
         
         # Use provided task list ID or default
         if task_list_id is None:
@@ -122,27 +154,98 @@ async def search_tasks(query: str, task_list_id: Optional[str] = None, max_resul
                 showHidden=False
             ).execute()
 
-        tasks_result = await asyncio.to_thread(_search_tasks)
+        tasks_result = await run_io(_search_tasks)
         all_tasks = tasks_result.get("items", [])
         
         # Filter tasks by query (Google Tasks API doesn't support server-side search)
         matching_tasks = []
-        query_lower = query.lower()
+        # Compiled once; a case-insensitive search avoids lower-casing every title and note
+        matches = re.compile(re.escape(query), re.IGNORECASE).search
         
         for task in all_tasks:
-            title = task.get("title", "").lower()
-            notes = task.get("notes", "").lower()
-            
-            if query_lower in title or query_lower in notes:
+            if matches(task.get("title") or "") or matches(task.get("notes") or ""):
                 task["taskListId"] = validated_task_list_id
                 matching_tasks.append(task)
                 
                 if len(matching_tasks) >= max_results:
                     break
         
-        return json.dumps(matching_tasks)
+        return to_json(matching_tasks)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
+
+@mcp.tool()
+async def search_all_tasks(query: str, max_results: Optional[int] = None) -> str:
+    """
+    Searches for tasks by text query across all of the user's task lists.
+    
+    Args:
+        query: The text to search for in task titles and notes.
+        max_results: Maximum number of tasks to return (optional, defaults to configured maximum).
+    
+    Returns:
+        A JSON string representing a list of matching tasks.
+    """
+    try:
+        service = await get_service("tasks", "v1")
+        
+        if max_results is None:
+            max_results = get_max_task_search_results()
+        per_list_results = get_default_task_max_results()
+        
+        def _list_task_list_ids():
+            # Follow every page, so lists beyond the first page are searched too
+            task_list_ids = []
+            page_token = None
+            while True:
+                response = service.tasklists().list(
+                    maxResults=_TASK_LISTS_PAGE_SIZE, pageToken=page_token
+                ).execute()
+                task_list_ids.extend(task_list["id"] for task_list in response.get("items", []))
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    return task_list_ids
+        
+        def _list_tasks(task_list_id):
+            return service.tasks().list(
+                tasklist=task_list_id,
+                maxResults=per_list_results,
+                showCompleted=False,
+                showHidden=False
+            ).execute()
+        
+        task_list_ids = await run_io(_list_task_list_ids)
+        
+        # Fetch every list at once, bounded to stay within the Tasks API rate limits
+        results = await gather_with_concurrency(
+            _TASK_LIST_CONCURRENCY,
+            *(run_io(_list_tasks, task_list_id) for task_list_id in task_list_ids),
+            return_exceptions=True
+        )
+        
+        matching_tasks = []
+        errors = []
+        matches = re.compile(re.escape(query), re.IGNORECASE).search
+        
+        for task_list_id, tasks_result in zip(task_list_ids, results):
+            if isinstance(tasks_result, HttpError):
+                logger.warning("Failed to list tasks for task list %s: %s", task_list_id, tasks_result)
+                errors.append(tasks_result)
+                continue
+            if isinstance(tasks_result, BaseException):
+                raise tasks_result
+            
+            for task in tasks_result.get("items", []):
+                if matches(task.get("title") or "") or matches(task.get("notes") or ""):
+                    task["taskListId"] = task_list_id
+                    matching_tasks.append(task)
+        
+        if errors and len(errors) == len(task_list_ids):
+            raise errors[0]
+        
+        return to_json(matching_tasks[:max_results])
+    except HttpError as error:
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def search_tasks_by_period(start_date: str, end_date: str, task_list_id: Optional[str] = None, max_results: Optional[int] = None) -> str:
@@ -158,9 +261,8 @@ async def search_tasks_by_period(start_date: str, end_date: str, task_list_id: O
     Returns:
         A JSON string representing a list of tasks within the date range.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "tasks", "v1", credentials=creds)
+        service = await get_service("tasks", "v1")
         
         # Use provided task list ID or default
         if task_list_id is None:
@@ -173,28 +275,36 @@ async def search_tasks_by_period(start_date: str, end_date: str, task_list_id: O
         if max_results is None:
             max_results = get_default_task_max_results()
         
+        try:
+            start_dt = datetime.fromisoformat(start_date).date()
+            end_dt = datetime.fromisoformat(end_date).date()
+        except ValueError:
+            return to_json({"error": "Invalid date format. Use YYYY-MM-DD format."})
+        
         def _list_tasks():
+            # Let the API drop tasks due outside the range; due dates are
+            # stored as midnight UTC, so the range covers whole days
             return service.tasks().list(
                 tasklist=validated_task_list_id,
                 maxResults=max_results,
                 showCompleted=False,
-                showHidden=False
+                showHidden=False,
+                dueMin=f"{start_dt.isoformat()}T00:00:00Z",
+                dueMax=f"{end_dt.isoformat()}T23:59:59Z"
             ).execute()
 
-        tasks_result = await asyncio.to_thread(_list_tasks)
+        tasks_result = await run_io(_list_tasks)
         all_tasks = tasks_result.get("items", [])
         
         # Filter tasks by date range
         matching_tasks = []
-        start_dt = datetime.fromisoformat(start_date).date()
-        end_dt = datetime.fromisoformat(end_date).date()
         
         for task in all_tasks:
             due_date_str = task.get("due")
             if due_date_str:
                 try:
-                    # Parse the due date (Google Tasks API returns RFC 3339 format)
-                    due_dt = datetime.fromisoformat(due_date_str.replace('Z', '+00:00')).date()
+                    # Due dates are RFC 3339 timestamps at midnight UTC; only the date part matters
+                    due_dt = date.fromisoformat(due_date_str[:10])
                     if start_dt <= due_dt <= end_dt:
                         task["taskListId"] = validated_task_list_id
                         matching_tasks.append(task)
@@ -205,9 +315,9 @@ async def search_tasks_by_period(start_date: str, end_date: str, task_list_id: O
                     # Skip tasks with invalid date formats
                     continue
         
-        return json.dumps(matching_tasks)
+        return to_json(matching_tasks)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def create_task(title: str, task_list_id: Optional[str] = None, description: Optional[str] = None, 
@@ -225,9 +335,8 @@ async def create_task(title: str, task_list_id: Optional[str] = None, descriptio
     Returns:
         A JSON string representing the created task.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "tasks", "v1", credentials=creds)
+        service = await get_service("tasks", "v1")
         
         # Use provided task list ID or default
         if task_list_id is None:
@@ -247,10 +356,9 @@ async def create_task(title: str, task_list_id: Optional[str] = None, descriptio
         if due_date:
             # Convert to RFC 3339 format for Google Tasks API
             try:
-                due_dt = datetime.fromisoformat(due_date)
-                task_body["due"] = due_dt.isoformat() + "Z"
+                task_body["due"] = _due_timestamp(due_date)
             except ValueError:
-                return json.dumps({"error": "Invalid date format. Use YYYY-MM-DD format."})
+                return to_json({"error": "Invalid date format. Use YYYY-MM-DD format."})
         
         if parent_task_id:
             task_body["parent"] = parent_task_id
@@ -261,12 +369,12 @@ async def create_task(title: str, task_list_id: Optional[str] = None, descriptio
                 body=task_body
             ).execute()
 
-        created_task = await asyncio.to_thread(_create_task)
+        created_task = await run_io(_create_task)
         created_task["taskListId"] = validated_task_list_id
         
-        return json.dumps(created_task)
+        return to_json(created_task)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def update_task(task_id: str, task_list_id: Optional[str] = None, title: Optional[str] = None,
@@ -286,9 +394,8 @@ async def update_task(task_id: str, task_list_id: Optional[str] = None, title: O
     Returns:
         A JSON string representing the updated task.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "tasks", "v1", credentials=creds)
+        service = await get_service("tasks", "v1")
         
         # Use provided task list ID or default
         if task_list_id is None:
@@ -309,14 +416,13 @@ async def update_task(task_id: str, task_list_id: Optional[str] = None, title: O
         if due_date is not None:
             # Convert to RFC 3339 format for Google Tasks API
             try:
-                due_dt = datetime.fromisoformat(due_date)
-                update_body["due"] = due_dt.isoformat() + "Z"
+                update_body["due"] = _due_timestamp(due_date)
             except ValueError:
-                return json.dumps({"error": "Invalid date format. Use YYYY-MM-DD format."})
+                return to_json({"error": "Invalid date format. Use YYYY-MM-DD format."})
         
         if status is not None:
             if status not in ["needsAction", "completed"]:
-                return json.dumps({"error": "Invalid status. Use 'needsAction' or 'completed'."})
+                return to_json({"error": "Invalid status. Use 'needsAction' or 'completed'."})
             update_body["status"] = status
         
         def _update_task():
@@ -326,12 +432,12 @@ async def update_task(task_id: str, task_list_id: Optional[str] = None, title: O
                 body=update_body
             ).execute()
 
-        updated_task = await asyncio.to_thread(_update_task)
+        updated_task = await run_io(_update_task)
         updated_task["taskListId"] = validated_task_list_id
         
-        return json.dumps(updated_task)
+        return to_json(updated_task)
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
 
 @mcp.tool()
 async def mark_task_completed(task_id: str, task_list_id: Optional[str] = None, completed: bool = True) -> str:
@@ -346,9 +452,8 @@ async def mark_task_completed(task_id: str, task_list_id: Optional[str] = None,
     Returns:
         A JSON string representing the updated task.
     """
-    creds = await asyncio.to_thread(get_credentials)
     try:
-        service = await asyncio.to_thread(build, "tasks", "v1", credentials=creds)
+        service = await get_service("tasks", "v1")
         
         # Use provided task list ID or default
         if task_list_id is None:
@@ -364,7 +469,7 @@ async def mark_task_completed(task_id: str, task_list_id: Optional[str] = None,
         
         if completed:
             # Set completion time to now
-            update_body["completed"] = datetime.utcnow().isoformat() + "Z"
+            update_body["completed"] = _utc_timestamp()
         
         def _update_task():
             return service.tasks().patch(
@@ -373,9 +478,99 @@ async def mark_task_completed(task_id: str, task_list_id: Optional[str] = None,
                 body=update_body
             ).execute()
 
-        updated_task = await asyncio.to_thread(_update_task)
+        updated_task = await run_io(_update_task)
         updated_task["taskListId"] = validated_task_list_id
         
-        return json.dumps(updated_task)
+        return to_json(updated_task)
+    except HttpError as error:
+        return to_json({"error": f"An error occurred: {error}"})
+
+@mcp.tool()
+async def mark_tasks_completed(task_ids: List[str], task_list_id: Optional[str] = None, completed: bool = True) -> str:
+    """
+    Marks several tasks in one task list as completed or incomplete.
+    
+    Args:
+        task_ids: The IDs of the tasks to update.
+        task_list_id: The ID of the task list (optional, defaults to configured default).
+        completed: Whether to mark the tasks as completed (True) or incomplete (False).
+    
+    Returns:
+        A JSON string with the updated tasks and the tasks that could not be updated.
+    """
+    try:
+        service = await get_service("tasks", "v1")
+        
+        # Use provided task list ID or default
+        if task_list_id is None:
+            task_list_id = get_default_task_list_id()
+        
+        # Validate task list ID
+        validated_task_list_id = validate_task_list_id(task_list_id)
+        
+        # Prepare update body, shared by every task
+        update_body = {
+            "status": "completed" if completed else "needsAction"
+        }
+        
+        if completed:
+            # Set completion time to now
+            update_body["completed"] = _utc_timestamp()
+        
+        # Task IDs double as batch request IDs, so they must be unique
+        unique_task_ids = list(dict.fromkeys(task_ids))
+        
+        def _update_tasks_batch(group):
+            # Send one HTTP request for the whole group instead of one per task
+            responses = {}
+            
+            def _collect(task_id, response, exception):
+                responses[task_id] = exception if exception is not None else response
+            
+            batch = service.new_batch_http_request(callback=_collect)
+            for task_id in group:
+                batch.add(
+                    service.tasks().patch(
+                        tasklist=validated_task_list_id,
+                        task=task_id,
+                        body=update_body
+                    ),
+                    request_id=task_id
+                )
+            batch.execute()
+            return [responses.get(task_id) for task_id in group]
+        
+        groups = [
+            unique_task_ids[i:i + _TASKS_BATCH_LIMIT]
+            for i in range(0, len(unique_task_ids), _TASKS_BATCH_LIMIT)
+        ]
+        group_results = await gather_with_concurrency(
+            _TASKS_BATCH_CONCURRENCY,
+            *(run_io(_update_tasks_batch, group) for group in groups),
+            return_exceptions=True
+        )
+        
+        updated_tasks = []
+        errors = []
+        for group, group_result in zip(groups, group_results):
+            if isinstance(group_result, BaseException):
+                group_result = [group_result] * len(group)
+            for task_id, result in zip(group, group_result):
+                if isinstance(result, HttpError):
+                    errors.append({"id": task_id, "error": f"An error occurred: {result}"})
+                elif isinstance(result, BaseException):
+                    raise result
+                elif result is None:
+                    # The batch response had no part for this task
+                    errors.append({"id": task_id, "error": "No response"})
+                else:
+                    result["taskListId"] = validated_task_list_id
+                    updated_tasks.append(result)
+        
+        return to_json({
+            "tasks": updated_tasks,
+            "errors": errors,
+            "total_updated": len(updated_tasks)
+        })
     except HttpError as error:
-        return json.dumps({"error": f"An error occurred: {error}"})
+        return to_json({"error": f"An error occurred: {error}"})
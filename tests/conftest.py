@@ -0,0 +1,108 @@
+import json
+from functools import lru_cache
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+
+from src.tools import _query_cache, gmail_tools
+
+
+class FakeBatch:
+    """
+    Stand-in for BatchHttpRequest that executes the queued requests one by one.
+    """
+    def __init__(self, callback=None):
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        request_id = request_id or str(len(self._requests) + 1)
+        self._requests.append((request_id, request, callback or self._callback))
+
+    def execute(self, http=None):
+        for request_id, request, callback in self._requests:
+            try:
+                response, exception = request.execute(), None
+            except HttpError as error:
+                response, exception = None, error
+            callback(request_id, response, exception)
+
+
+@pytest.fixture
+def fake_batch():
+    """
+    Provides the FakeBatch class, for use as `new_batch_http_request.side_effect`.
+    """
+    return FakeBatch
+
+
+@lru_cache(maxsize=None)
+def _service_spec(api, version):
+    # Top-level resources from the discovery document bundled with
+    # googleapiclient, parsed once per test session
+    document = json.loads(get_static_doc(api, version))
+    return (*document["resources"], "new_batch_http_request")
+
+
+def _patch_service(monkeypatch, module_name, api, version):
+    # Specced so a mistyped resource (e.g. `service.event()`) fails the test
+    service = MagicMock(spec=_service_spec(api, version))
+    monkeypatch.setattr(f"src.tools.{module_name}.get_service", AsyncMock(return_value=service))
+    return service
+
+
+@pytest.fixture
+def calendar_service(monkeypatch):
+    """
+    Patches calendar_tools.get_service and returns the fake Calendar client.
+    
+    Tests only set the response they need, e.g.
+    `calendar_service.events().list().execute.return_value = {...}`.
+    """
+    return _patch_service(monkeypatch, "calendar_tools", "calendar", "v3")
+
+
+@pytest.fixture
+def drive_service(monkeypatch):
+    """
+    Patches drive_tools.get_service and returns the fake Drive client.
+    """
+    return _patch_service(monkeypatch, "drive_tools", "drive", "v3")
+
+
+@pytest.fixture
+def gmail_service(monkeypatch):
+    """
+    Patches gmail_tools.get_service and returns the fake Gmail client.
+    """
+    return _patch_service(monkeypatch, "gmail_tools", "gmail", "v1")
+
+
+@pytest.fixture
+def tasks_service(monkeypatch):
+    """
+    Patches tasks_tools.get_service and returns the fake Tasks client.
+    """
+    return _patch_service(monkeypatch, "tasks_tools", "tasks", "v1")
+
+
+@pytest.fixture(autouse=True)
+def clear_query_cache():
+    """
+    Keeps cached search results from leaking between tests.
+    """
+    _query_cache.clear()
+    yield
+    _query_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_labels_cache():
+    """
+    Keeps the cached Gmail label list from leaking between tests.
+    """
+    gmail_tools._invalidate_labels_cache()
+    yield
+    gmail_tools._invalidate_labels_cache()
@@ -0,0 +1,80 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+import src.auth as auth
+from src.auth import get_credentials, get_credentials_async
+
+
+@pytest.fixture(autouse=True)
+def reset_credentials_cache():
+    auth._CREDS_CACHE = None
+    auth._REFRESH_FUTURE = None
+    yield
+    auth._CREDS_CACHE = None
+    auth._REFRESH_FUTURE = None
+
+
+def test_get_credentials_reuses_cached_credentials():
+    """
+    Tests that valid credentials are loaded from token.json only once.
+    """
+    mock_creds = Mock(valid=True)
+    with patch("src.auth.os.path.exists", return_value=True), \
+         patch("src.auth.Credentials.from_authorized_user_file", return_value=mock_creds) as mock_load:
+        assert get_credentials() is mock_creds
+        assert get_credentials() is mock_creds
+
+    mock_load.assert_called_once()
+
+
+def test_get_credentials_refreshes_expired_credentials_in_place():
+    """
+    Tests that expired cached credentials are refreshed and persisted.
+    """
+    mock_creds = Mock(valid=False, expired=True, refresh_token="refresh", token="old")
+
+    def _refresh(request):
+        mock_creds.token = "new"
+        mock_creds.valid = True
+
+    mock_creds.refresh.side_effect = _refresh
+    auth._CREDS_CACHE = mock_creds
+
+    with patch("src.auth._save_credentials") as mock_save:
+        assert get_credentials() is mock_creds
+
+    mock_creds.refresh.assert_called_once()
+    mock_save.assert_called_once_with(mock_creds)
+
+
+async def test_get_credentials_async_fast_path():
+    """
+    Tests that valid cached credentials are returned without a thread hop.
+    """
+    mock_creds = Mock(valid=True)
+    auth._CREDS_CACHE = mock_creds
+
+    with patch("src.auth.asyncio.to_thread") as mock_to_thread:
+        assert await get_credentials_async() is mock_creds
+
+    mock_to_thread.assert_not_called()
+
+
+async def test_get_credentials_async_single_flight():
+    """
+    Tests that concurrent callers share a single credential load/refresh.
+    """
+    mock_creds = Mock(valid=True)
+
+    def _slow_get_credentials():
+        time.sleep(0.05)
+        return mock_creds
+
+    with patch("src.auth.get_credentials", side_effect=_slow_get_credentials) as mock_get:
+        results = await asyncio.gather(*(get_credentials_async() for _ in range(5)))
+
+    assert all(result is mock_creds for result in results)
+    mock_get.assert_called_once()
+    assert auth._REFRESH_FUTURE is None
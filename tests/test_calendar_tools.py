@@ -1,277 +1,208 @@
 import pytest
 import json
-from unittest.mock import AsyncMock, MagicMock, patch
-from typing import List
+from unittest.mock import MagicMock, patch
+from googleapiclient.errors import HttpError
 
 from src.tools.calendar_tools import list_calendars, list_calendar_events, search_calendar_events, get_calendar_event_details
 
-@pytest.mark.asyncio
-@patch("src.tools.calendar_tools.get_credentials", new_callable=AsyncMock)
-@patch("src.tools.calendar_tools.build", new_callable=MagicMock)
-async def test_list_calendars(mock_build, mock_get_credentials):
+# Canned API resources, shared by the mock responses and the expected results
+CALENDARS = [
+    {
+        "id": "primary",
+        "summary": "Your Name",
+        "description": "Primary calendar",
+        "accessRole": "owner",
+        "primary": True
+    },
+    {
+        "id": "work@company.com",
+        "summary": "Work Calendar",
+        "description": "Company work calendar",
+        "accessRole": "reader",
+        "primary": False
+    }
+]
+
+def _make_event(number, summary, hour):
+    # A one-hour event on 2023-01-01 starting at `hour` UTC
+    return {
+        "id": f"event{number}",
+        "summary": summary,
+        "start": {"dateTime": f"2023-01-01T{hour:02d}:00:00+00:00"},
+        "end": {"dateTime": f"2023-01-01T{hour + 1:02d}:00:00+00:00"}
+    }
+
+TEAM_MEETING = _make_event(1, "Team Meeting", 10)
+PROJECT_REVIEW = _make_event(2, "Project Review", 14)
+CLIENT_MEETING = _make_event(3, "Client Meeting", 16)
+WORK_MEETING = _make_event(4, "Work Meeting", 14)
+TEAM_MEETING_DETAILS = {
+    **TEAM_MEETING,
+    "description": "Weekly team sync",
+    "attendees": [
+        {"email": "john@example.com", "responseStatus": "accepted"}
+    ]
+}
+NOT_FOUND = HttpError(resp=MagicMock(status=404), content=b"Not Found")
+
+async def test_list_calendars(calendar_service):
     """
     Tests the list_calendars function.
     """
     # Mock the Calendar API response
-    mock_service = MagicMock()
-    mock_calendar_list = MagicMock()
-    mock_list = MagicMock()
-    mock_list.execute.return_value = {
-        "items": [
-            {
-                "id": "primary",
-                "summary": "Your Name",
-                "description": "Primary calendar",
-                "accessRole": "owner",
-                "primary": True
-            },
-            {
-                "id": "work@company.com",
-                "summary": "Work Calendar",
-                "description": "Company work calendar",
-                "accessRole": "reader",
-                "primary": False
-            }
-        ]
-    }
-    mock_calendar_list.list.return_value = mock_list
-    mock_service.calendarList.return_value = mock_calendar_list
-    mock_build.return_value = mock_service
+    calendar_service.calendarList().list().execute.return_value = {"items": CALENDARS}
 
     # Call the function
     result = await list_calendars()
 
     # Assert the result
-    expected = [
-        {
-            "id": "primary",
-            "summary": "Your Name",
-            "description": "Primary calendar",
-            "accessRole": "owner",
-            "primary": True
-        },
-        {
-            "id": "work@company.com",
-            "summary": "Work Calendar",
-            "description": "Company work calendar",
-            "accessRole": "reader",
-            "primary": False
-        }
-    ]
-    assert json.loads(result) == expected
-
-@pytest.mark.asyncio
-@patch("src.tools.calendar_tools.get_credentials", new_callable=AsyncMock)
-@patch("src.tools.calendar_tools.build", new_callable=MagicMock)
-async def test_list_calendar_events(mock_build, mock_get_credentials):
+    assert json.loads(result) == CALENDARS
+
+@pytest.mark.parametrize("tool, kwargs, event", [
+    (list_calendar_events, {"calendar_ids": ["primary"]}, TEAM_MEETING),
+    (list_calendar_events, {"calendar_ids": ["primary"], "query": "Project"}, PROJECT_REVIEW),
+    (search_calendar_events, {"calendar_ids": ["primary"], "query": "Client"}, CLIENT_MEETING),
+    (list_calendar_events, {}, TEAM_MEETING),
+    (list_calendar_events, {"calendar_ids": ["work@company.com"]}, WORK_MEETING),
+    (search_calendar_events, {"query": "Project"}, PROJECT_REVIEW),
+], ids=["list", "list_with_query", "search", "list_with_defaults", "list_with_specific_calendar", "search_with_defaults"])
+@patch("src.tools.calendar_tools.get_default_calendar_ids", return_value=["primary"])
+async def test_list_calendar_events_single_calendar(mock_get_defaults, calendar_service, tool, kwargs, event):
     """
-    Tests the list_calendar_events function.
+    Tests list_calendar_events and search_calendar_events against a single calendar.
     """
+    # Calls without calendar_ids fall back to the default calendars
+    calendar_id = kwargs.get("calendar_ids", ["primary"])[0]
+
     # Mock the Calendar API response
-    mock_service = MagicMock()
-    mock_events = MagicMock()
-    mock_list = MagicMock()
-    mock_list.execute.return_value = {
-        "items": [
-            {
-                "id": "event1",
-                "summary": "Team Meeting",
-                "start": {"dateTime": "2023-01-01T10:00:00+00:00"},
-                "end": {"dateTime": "2023-01-01T11:00:00+00:00"}
-            }
-        ]
-    }
-    mock_events.list.return_value = mock_list
-    mock_service.events.return_value = mock_events
-    mock_build.return_value = mock_service
+    calendar_service.events().list().execute.return_value = {"items": [event]}
 
     # Call the function
-    result = await list_calendar_events(
-        calendar_ids=["primary"],
+    result = await tool(
         start_time="2023-01-01T00:00:00Z",
-        end_time="2023-01-02T00:00:00Z"
+        end_time="2023-01-02T00:00:00Z",
+        **kwargs
     )
 
+    # Assert the result, and that the query reached the API
+    assert json.loads(result) == [{**event, "calendarId": calendar_id}]
+    assert calendar_service.events().list.call_args[1]["calendarId"] == calendar_id
+    assert calendar_service.events().list.call_args[1]["q"] == kwargs.get("query")
+    assert mock_get_defaults.called == ("calendar_ids" not in kwargs)
+
+@pytest.mark.parametrize("args, calendar_id, event", [
+    (("event1", "primary"), "primary", TEAM_MEETING_DETAILS),
+    (("event1",), "primary", TEAM_MEETING_DETAILS),
+    (("event4", "work@company.com"), "work@company.com", {**WORK_MEETING, "description": "Work calendar event"}),
+], ids=["primary_calendar", "default_calendar", "specific_calendar"])
+@patch("src.tools.calendar_tools.get_default_calendar_ids", return_value=["primary"])
+async def test_get_calendar_event_details(mock_get_defaults, calendar_service, args, calendar_id, event):
+    """
+    Tests the get_calendar_event_details function.
+    """
+    # Mock the Calendar API response
+    calendar_service.events().get().execute.return_value = event
+
+    # Call the function
+    result = await get_calendar_event_details(*args)
+
     # Assert the result
-    expected = [
-        {
-            "id": "event1",
-            "summary": "Team Meeting",
-            "start": {"dateTime": "2023-01-01T10:00:00+00:00"},
-            "end": {"dateTime": "2023-01-01T11:00:00+00:00"},
-            "calendarId": "primary"
-        }
-    ]
-    assert json.loads(result) == expected
+    assert json.loads(result) == event
+    assert calendar_service.events().get.call_args[1]["calendarId"] == calendar_id
 
-@pytest.mark.asyncio
-@patch("src.tools.calendar_tools.get_credentials", new_callable=AsyncMock)
-@patch("src.tools.calendar_tools.build", new_callable=MagicMock)
-async def test_list_calendar_events_with_query(mock_build, mock_get_credentials):
+async def test_list_calendar_events_multiple_calendars(calendar_service, fake_batch):
     """
-    Tests the list_calendar_events function with query parameter.
+    Tests that list_calendar_events fetches several calendars in a single batch request.
     """
-    # Mock the Calendar API response
-    mock_service = MagicMock()
-    mock_events = MagicMock()
-    mock_list = MagicMock()
-    mock_list.execute.return_value = {
-        "items": [
-            {
-                "id": "event2",
-                "summary": "Project Review",
-                "start": {"dateTime": "2023-01-01T14:00:00+00:00"},
-                "end": {"dateTime": "2023-01-01T15:00:00+00:00"}
-            }
-        ]
-    }
-    mock_events.list.return_value = mock_list
-    mock_service.events.return_value = mock_events
-    mock_build.return_value = mock_service
+    # Mock the Calendar API response for every calendar
+    calendar_service.events().list().execute.return_value = {"items": [TEAM_MEETING]}
+
+    # Record the batches so their calls can be counted
+    batches = []
+
+    def _new_batch(**kwargs):
+        batch = MagicMock(wraps=fake_batch(**kwargs))
+        batches.append(batch)
+        return batch
+
+    calendar_service.new_batch_http_request.side_effect = _new_batch
 
-    # Call the function with query
+    # Call the function with multiple calendar IDs
     result = await list_calendar_events(
-        calendar_ids=["primary"],
+        calendar_ids=["primary", "work@company.com"],
         start_time="2023-01-01T00:00:00Z",
-        end_time="2023-01-02T00:00:00Z",
-        query="Project"
+        end_time="2023-01-02T00:00:00Z"
     )
 
-    # Assert the result
-    expected = [
-        {
-            "id": "event2",
-            "summary": "Project Review",
-            "start": {"dateTime": "2023-01-01T14:00:00+00:00"},
-            "end": {"dateTime": "2023-01-01T15:00:00+00:00"},
-            "calendarId": "primary"
-        }
-    ]
-    assert json.loads(result) == expected
+    # Assert that both calendars went out in one HTTP round trip
+    assert len(batches) == 1
+    assert batches[0].add.call_count == 2
+    assert batches[0].execute.call_count == 1
+    assert [event["calendarId"] for event in json.loads(result)] == ["primary", "work@company.com"]
 
-@pytest.mark.asyncio
-@patch("src.tools.calendar_tools.get_credentials", new_callable=AsyncMock)
-@patch("src.tools.calendar_tools.build", new_callable=MagicMock)
-async def test_search_calendar_events(mock_build, mock_get_credentials):
+async def test_list_calendar_events_partial_failure(calendar_service, fake_batch):
     """
-    Tests the search_calendar_events function.
+    Tests that a failing calendar does not discard events from the other calendars.
     """
-    # Mock the Calendar API response
-    mock_service = MagicMock()
-    mock_events = MagicMock()
-    mock_list = MagicMock()
-    mock_list.execute.return_value = {
-        "items": [
-            {
-                "id": "event3",
-                "summary": "Client Meeting",
-                "start": {"dateTime": "2023-01-01T16:00:00+00:00"},
-                "end": {"dateTime": "2023-01-01T17:00:00+00:00"}
-            }
-        ]
-    }
-    mock_events.list.return_value = mock_list
-    mock_service.events.return_value = mock_events
-    mock_build.return_value = mock_service
+    ok_list = MagicMock()
+    ok_list.execute.return_value = {"items": [TEAM_MEETING]}
+    failing_list = MagicMock()
+    failing_list.execute.side_effect = NOT_FOUND
 
-    # Call the function
-    result = await search_calendar_events(
-        calendar_ids=["primary"],
-        query="Client",
+    calendar_service.events().list.side_effect = (
+        lambda **kwargs: ok_list if kwargs["calendarId"] == "primary" else failing_list
+    )
+    calendar_service.new_batch_http_request.side_effect = fake_batch
+
+    result = await list_calendar_events(
+        calendar_ids=["primary", "missing@company.com"],
         start_time="2023-01-01T00:00:00Z",
         end_time="2023-01-02T00:00:00Z"
     )
 
-    # Assert the result
-    expected = [
-        {
-            "id": "event3",
-            "summary": "Client Meeting",
-            "start": {"dateTime": "2023-01-01T16:00:00+00:00"},
-            "end": {"dateTime": "2023-01-01T17:00:00+00:00"},
-            "calendarId": "primary"
-        }
-    ]
-    assert json.loads(result) == expected
+    result_data = json.loads(result)
+    assert len(result_data) == 1
+    assert result_data[0]["calendarId"] == "primary"
+    calendar_service.new_batch_http_request.assert_called_once()
 
-@pytest.mark.asyncio
-@patch("src.tools.calendar_tools.get_credentials", new_callable=AsyncMock)
-@patch("src.tools.calendar_tools.build", new_callable=MagicMock)
-async def test_get_calendar_event_details(mock_build, mock_get_credentials):
+async def test_list_calendar_events_all_calendars_fail(calendar_service):
     """
-    Tests the get_calendar_event_details function.
+    Tests that an error is returned when every calendar fails.
     """
-    # Mock the Calendar API response
-    mock_service = MagicMock()
-    mock_events = MagicMock()
-    mock_get = MagicMock()
-    mock_get.execute.return_value = {
-        "id": "event1",
-        "summary": "Team Meeting",
-        "description": "Weekly team sync",
-        "start": {"dateTime": "2023-01-01T10:00:00+00:00"},
-        "end": {"dateTime": "2023-01-01T11:00:00+00:00"},
-        "attendees": [
-            {"email": "john@example.com", "responseStatus": "accepted"}
-        ]
-    }
-    mock_events.get.return_value = mock_get
-    mock_service.events.return_value = mock_events
-    mock_build.return_value = mock_service
+    calendar_service.events().list().execute.side_effect = NOT_FOUND
 
-    # Call the function
-    result = await get_calendar_event_details("primary", "event1")
+    result = await list_calendar_events(
+        calendar_ids=["missing@company.com"],
+        start_time="2023-01-01T00:00:00Z",
+        end_time="2023-01-02T00:00:00Z"
+    )
 
-    # Assert the result
-    expected = {
-        "id": "event1",
-        "summary": "Team Meeting",
-        "description": "Weekly team sync",
-        "start": {"dateTime": "2023-01-01T10:00:00+00:00"},
-        "end": {"dateTime": "2023-01-01T11:00:00+00:00"},
-        "attendees": [
-            {"email": "john@example.com", "responseStatus": "accepted"}
-        ]
-    }
-    assert json.loads(result) == expected
+    assert "error" in json.loads(result)
 
-@pytest.mark.asyncio
-@patch("src.tools.calendar_tools.get_credentials", new_callable=AsyncMock)
-@patch("src.tools.calendar_tools.build", new_callable=MagicMock)
-async def test_list_calendar_events_multiple_calendars(mock_build, mock_get_credentials):
+async def test_list_calendar_events_merges_calendars_by_start_time(calendar_service, fake_batch):
     """
-    Tests the list_calendar_events function with multiple calendars.
+    Tests that events from several calendars are interleaved in start time order.
     """
-    # Mock the Calendar API response for multiple calendars
-    mock_service = MagicMock()
-    mock_events = MagicMock()
-    
-    # Mock different responses for different calendars
-    def mock_list_execute():
-        # This would be called multiple times with different calendar IDs
-        return {
-            "items": [
-                {
-                    "id": "event1",
-                    "summary": "Primary Calendar Event",
-                    "start": {"dateTime": "2023-01-01T10:00:00+00:00"},
-                    "end": {"dateTime": "2023-01-01T11:00:00+00:00"}
-                }
-            ]
-        }
-    
-    mock_list = MagicMock()
-    mock_list.execute.side_effect = mock_list_execute
-    mock_events.list.return_value = mock_list
-    mock_service.events.return_value = mock_events
-    mock_build.return_value = mock_service
+    def _list(**kwargs):
+        events = {
+            "primary": [_make_event(1, "Breakfast", 9), _make_event(3, "Lunch", 13)],
+            "work@company.com": [_make_event(2, "Standup", 11)],
+        }[kwargs["calendarId"]]
+        request = MagicMock()
+        request.execute.return_value = {"items": events}
+        return request
+
+    calendar_service.events().list.side_effect = _list
+    calendar_service.new_batch_http_request.side_effect = fake_batch
 
-    # Call the function with multiple calendar IDs
     result = await list_calendar_events(
         calendar_ids=["primary", "work@company.com"],
         start_time="2023-01-01T00:00:00Z",
         end_time="2023-01-02T00:00:00Z"
     )
 
-    # Assert that the function was called for each calendar
-    assert mock_events.list.call_count == 2
+    result_data = json.loads(result)
+    assert [event["calendarId"] for event in result_data] == ["primary", "work@company.com", "primary"]
+    assert [event["start"]["dateTime"] for event in result_data] == sorted(
+        event["start"]["dateTime"] for event in result_data
+    )
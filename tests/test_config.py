@@ -1,74 +1,89 @@
 import pytest
-import os
-from unittest.mock import patch
 
-from src.config import get_default_calendar_ids, validate_calendar_ids
+from src.config import (
+    get_default_calendar_ids, validate_calendar_ids, validate_task_list_id, get_log_level, clear_cache
+)
 
-def test_get_default_calendar_ids_default():
-    """
-    Tests get_default_calendar_ids with no environment variable set.
-    """
-    with patch.dict(os.environ, {}, clear=True):
-        result = get_default_calendar_ids()
-        assert result == ["primary"]
+@pytest.fixture(autouse=True)
+def clear_config_cache():
+    clear_cache()
+    yield
+    clear_cache()
 
-def test_get_default_calendar_ids_single():
-    """
-    Tests get_default_calendar_ids with a single calendar ID.
-    """
-    with patch.dict(os.environ, {"DEFAULT_CALENDAR_IDS": "work@company.com"}):
-        result = get_default_calendar_ids()
-        assert result == ["work@company.com"]
+def _set_env(monkeypatch, name, value):
+    # None means the variable is unset
+    if value is None:
+        monkeypatch.delenv(name, raising=False)
+    else:
+        monkeypatch.setenv(name, value)
 
-def test_get_default_calendar_ids_multiple():
-    """
-    Tests get_default_calendar_ids with multiple calendar IDs.
-    """
-    with patch.dict(os.environ, {"DEFAULT_CALENDAR_IDS": "primary,work@company.com,personal@gmail.com"}):
-        result = get_default_calendar_ids()
-        assert result == ["primary", "work@company.com", "personal@gmail.com"]
+@pytest.mark.parametrize("value, expected", [
+    (None, ["primary"]),
+    ("work@company.com", ["work@company.com"]),
+    ("primary,work@company.com,personal@gmail.com", ["primary", "work@company.com", "personal@gmail.com"]),
+    (" primary , work@company.com ", ["primary", "work@company.com"]),
+], ids=["default", "single", "multiple", "with_spaces"])
+def test_get_default_calendar_ids(monkeypatch, value, expected):
+    """
+    Tests get_default_calendar_ids against the DEFAULT_CALENDAR_IDS environment variable.
+    """
+    _set_env(monkeypatch, "DEFAULT_CALENDAR_IDS", value)
+    assert get_default_calendar_ids() == expected
 
-def test_get_default_calendar_ids_with_spaces():
-    """
-    Tests get_default_calendar_ids with spaces in the environment variable.
-    """
-    with patch.dict(os.environ, {"DEFAULT_CALENDAR_IDS": " primary , work@company.com "}):
-        result = get_default_calendar_ids()
-        assert result == ["primary", "work@company.com"]
-
-def test_validate_calendar_ids_empty():
-    """
-    Tests validate_calendar_ids with empty list.
-    """
-    with patch.dict(os.environ, {"DEFAULT_CALENDAR_IDS": "primary,work@company.com"}):
-        result = validate_calendar_ids([])
-        assert result == ["primary", "work@company.com"]
+@pytest.mark.parametrize("calendar_ids, expected", [
+    ([], ["primary", "work@company.com"]),
+    (["primary", "work@company.com"], ["primary", "work@company.com"]),
+    (["primary", "primary", "work@company.com"], ["primary", "work@company.com"]),
+    ([" primary ", " work@company.com "], ["primary", "work@company.com"]),
+    (["", "primary", "", "work@company.com"], ["primary", "work@company.com"]),
+], ids=["empty", "valid", "duplicates", "with_spaces", "empty_strings"])
+def test_validate_calendar_ids(monkeypatch, calendar_ids, expected):
+    """
+    Tests validate_calendar_ids, falling back to DEFAULT_CALENDAR_IDS when nothing valid is given.
+    """
+    monkeypatch.setenv("DEFAULT_CALENDAR_IDS", "primary,work@company.com")
+    assert validate_calendar_ids(calendar_ids) == expected
 
-def test_validate_calendar_ids_valid():
+def test_validate_calendar_ids_returns_fresh_lists(monkeypatch):
     """
-    Tests validate_calendar_ids with valid calendar IDs.
+    Tests that callers mutating a returned list do not change the cached result.
     """
-    result = validate_calendar_ids(["primary", "work@company.com"])
-    assert result == ["primary", "work@company.com"]
+    monkeypatch.delenv("DEFAULT_CALENDAR_IDS", raising=False)
+    validate_calendar_ids(["primary"]).append("work@company.com")
+    get_default_calendar_ids().append("work@company.com")
+    assert validate_calendar_ids(["primary"]) == ["primary"]
+    assert get_default_calendar_ids() == ["primary"]
 
-def test_validate_calendar_ids_duplicates():
+def test_get_default_calendar_ids_cached_until_cleared(monkeypatch):
     """
-    Tests validate_calendar_ids with duplicate calendar IDs.
+    Tests that get_default_calendar_ids reads the environment once until the cache is cleared.
     """
-    result = validate_calendar_ids(["primary", "primary", "work@company.com"])
-    assert result == ["primary", "work@company.com"]
+    monkeypatch.setenv("DEFAULT_CALENDAR_IDS", "primary")
+    assert get_default_calendar_ids() == ["primary"]
+    monkeypatch.setenv("DEFAULT_CALENDAR_IDS", "work@company.com")
+    assert get_default_calendar_ids() == ["primary"]
+    clear_cache()
+    assert get_default_calendar_ids() == ["work@company.com"]
 
-def test_validate_calendar_ids_with_spaces():
+def test_validate_task_list_id_strips_and_falls_back_to_default(monkeypatch):
     """
-    Tests validate_calendar_ids with calendar IDs containing spaces.
+    Tests that validate_task_list_id strips IDs and falls back to the current default after clear_cache.
     """
-    result = validate_calendar_ids([" primary ", " work@company.com "])
-    assert result == ["primary", "work@company.com"]
+    assert validate_task_list_id("  list1 ") == "list1"
+    monkeypatch.setenv("DEFAULT_TASK_LIST_ID", "work")
+    assert validate_task_list_id("") == "work"
+    monkeypatch.setenv("DEFAULT_TASK_LIST_ID", "home")
+    clear_cache()
+    assert validate_task_list_id("") == "home"
 
-def test_validate_calendar_ids_empty_strings():
+@pytest.mark.parametrize("value, expected", [
+    (None, "WARNING"),
+    ("debug", "DEBUG"),
+    ("verbose", "WARNING"),
+], ids=["default", "from_env", "invalid"])
+def test_get_log_level(monkeypatch, value, expected):
     """
-    Tests validate_calendar_ids with empty strings.
+    Tests that the log level is read from MCP_LOG_LEVEL, and falls back to WARNING if unset or invalid.
     """
-    with patch.dict(os.environ, {"DEFAULT_CALENDAR_IDS": "primary,work@company.com"}):
-        result = validate_calendar_ids(["", "primary", "", "work@company.com"])
-        assert result == ["primary", "work@company.com"] 
\ No newline at end of file
+    _set_env(monkeypatch, "MCP_LOG_LEVEL", value)
+    assert get_log_level() == expected
@@ -0,0 +1,66 @@
+import os
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.config import clear_cache
+from src.tools import _content_cache
+from src.tools._content_cache import get_cached_content, set_cached_content
+from src.tools.drive_tools import _extract_file_content_for_search
+
+
+@pytest.fixture(autouse=True)
+def content_cache_dir(tmp_path):
+    with patch.dict(os.environ, {'CONTENT_CACHE_DIR': str(tmp_path), 'CONTENT_CACHE_SIZE_MB': '10'}):
+        clear_cache()
+        _content_cache.reset()
+        yield tmp_path
+        _content_cache.reset()
+    clear_cache()
+
+
+def test_content_cache_round_trip():
+    """
+    Tests that cached text is returned only for the same file revision.
+    """
+    set_cached_content("file1", "2023-01-02T00:00:00Z", "cached text")
+
+    assert get_cached_content("file1", "2023-01-02T00:00:00Z") == "cached text"
+    assert get_cached_content("file1", "2023-01-03T00:00:00Z") is None
+
+
+def test_content_cache_requires_modified_time():
+    """
+    Tests that nothing is cached when the file revision is unknown.
+    """
+    set_cached_content("file1", None, "cached text")
+
+    assert get_cached_content("file1", None) is None
+
+
+def test_content_cache_disabled_with_zero_size():
+    """
+    Tests that a size limit of 0 disables the cache.
+    """
+    with patch.dict(os.environ, {'CONTENT_CACHE_SIZE_MB': '0'}):
+        clear_cache()
+        _content_cache.reset()
+        set_cached_content("file1", "2023-01-02T00:00:00Z", "cached text")
+
+        assert get_cached_content("file1", "2023-01-02T00:00:00Z") is None
+
+
+async def test_extract_file_content_uses_cache():
+    """
+    Tests that a repeat search of an unchanged file skips the download.
+    """
+    with patch('src.tools.drive_tools._extract_text_content', new_callable=AsyncMock) as mock_extract:
+        mock_extract.return_value = "some test content"
+
+        for _ in range(2):
+            content_info = await _extract_file_content_for_search(
+                Mock(), "file1", "text/plain", "test", False, False,
+                modified_time="2023-01-02T00:00:00Z"
+            )
+            assert content_info["match_count"] == 1
+
+    mock_extract.assert_called_once()
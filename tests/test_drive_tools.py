@@ -1,9 +1,17 @@
-import pytest
+import asyncio
+import io
+import re
+import sys
 import json
-from unittest.mock import Mock, patch, AsyncMock
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
 from src.tools.drive_tools import (
+    get_drive_file_details,
     search_drive_by_content,
     search_within_file_content,
+    _extract_file_content_for_search,
+    _extract_pdf_content,
+    _compile_user_regex,
     _find_content_matches,
     _generate_search_snippets
 )
@@ -12,17 +20,12 @@ from src.tools.drive_tools import (
 class TestContentSearch:
     """Test cases for Google Drive content search functionality."""
 
-    @pytest.mark.asyncio
-    async def test_search_drive_by_content_basic(self):
+    async def test_search_drive_by_content_basic(self, drive_service):
         """Test basic content search functionality."""
-        with patch('src.tools.drive_tools.get_credentials') as mock_creds, \
-             patch('src.tools.drive_tools.build') as mock_build, \
-             patch('src.tools.drive_tools._extract_file_content_for_search') as mock_extract:
+        with patch('src.tools.drive_tools._extract_file_content_for_search') as mock_extract:
             
-            # Mock credentials and service
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
+            # Mock service
+            mock_service = drive_service
             
             # Mock file list response
             mock_files = [
@@ -54,7 +57,38 @@ class TestContentSearch:
             assert result_data["results"][0]["name"] == "test_doc.docx"
             assert result_data["results"][0]["match_count"] == 1
 
-    @pytest.mark.asyncio
+    async def test_search_drive_by_content_extracts_files_concurrently(self, drive_service):
+        """Test that files are scanned concurrently and results keep the listing order."""
+        with patch('src.tools.drive_tools._extract_file_content_for_search') as mock_extract:
+            
+            mock_service = drive_service
+            
+            mock_service.files().list().execute.return_value = {
+                "files": [
+                    {"id": "slow", "name": "slow.txt", "mimeType": "text/plain"},
+                    {"id": "fast", "name": "fast.txt", "mimeType": "text/plain"}
+                ]
+            }
+            
+            in_flight = 0
+            max_in_flight = 0
+            
+            async def _extract(service, file_id, *args, **kwargs):
+                nonlocal in_flight, max_in_flight
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.02 if file_id == "slow" else 0)
+                in_flight -= 1
+                return {"has_matches": True, "snippets": [], "match_count": 1}
+            
+            mock_extract.side_effect = _extract
+            
+            result = await search_drive_by_content("test")
+            result_data = json.loads(result)
+            
+            assert [item["id"] for item in result_data["results"]] == ["slow", "fast"]
+            assert max_in_flight == 2
+
     async def test_search_drive_by_content_empty_term(self):
         """Test search with empty search term."""
         result = await search_drive_by_content("")
@@ -63,16 +97,11 @@ class TestContentSearch:
         assert "error" in result_data
         assert "cannot be empty" in result_data["error"]
 
-    @pytest.mark.asyncio
-    async def test_search_drive_by_content_with_folder_filter(self):
+    async def test_search_drive_by_content_with_folder_filter(self, drive_service):
         """Test content search with folder filter."""
-        with patch('src.tools.drive_tools.get_credentials') as mock_creds, \
-             patch('src.tools.drive_tools.build') as mock_build, \
-             patch('src.tools.drive_tools._extract_file_content_for_search') as mock_extract:
+        with patch('src.tools.drive_tools._extract_file_content_for_search') as mock_extract:
             
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
+            mock_service = drive_service
             
             mock_service.files().list().execute.return_value = {"files": []}
             mock_extract.return_value = {"has_matches": False, "snippets": [], "match_count": 0}
@@ -85,16 +114,32 @@ class TestContentSearch:
             call_args = mock_service.files().list.call_args
             assert "'folder123' in parents" in call_args[1]['q']
 
-    @pytest.mark.asyncio
-    async def test_search_drive_by_content_with_regex(self):
+    async def test_search_drive_by_content_with_multiple_terms(self, drive_service):
+        """Test that additional search terms are OR-ed into the Drive query."""
+        mock_service = drive_service
+        mock_service.files().list().execute.return_value = {"files": []}
+        
+        await search_drive_by_content("budget", search_terms=["roadmap", " "])
+        
+        query = mock_service.files().list.call_args[1]['q']
+        assert "(fullText contains 'budget' or fullText contains 'roadmap')" in query
+
+    async def test_search_drive_by_content_escapes_quotes(self, drive_service):
+        """Test that quotes and backslashes in user input are escaped in the Drive query."""
+        mock_service = drive_service
+        mock_service.files().list().execute.return_value = {"files": []}
+        
+        await search_drive_by_content("o'brien\\notes", folder_id="it's")
+        
+        query = mock_service.files().list.call_args[1]['q']
+        assert "fullText contains 'o\\'brien\\\\notes'" in query
+        assert "'it\\'s' in parents" in query
+
+    async def test_search_drive_by_content_with_regex(self, drive_service):
         """Test content search with regex enabled."""
-        with patch('src.tools.drive_tools.get_credentials') as mock_creds, \
-             patch('src.tools.drive_tools.build') as mock_build, \
-             patch('src.tools.drive_tools._extract_file_content_for_search') as mock_extract:
+        with patch('src.tools.drive_tools._extract_file_content_for_search') as mock_extract:
             
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
+            mock_service = drive_service
             
             mock_service.files().list().execute.return_value = {"files": []}
             mock_extract.return_value = {"has_matches": False, "snippets": [], "match_count": 0}
@@ -105,16 +150,11 @@ class TestContentSearch:
             assert "results" in result_data
             assert result_data["total_matches"] == 0
 
-    @pytest.mark.asyncio
-    async def test_search_within_file_content(self):
+    async def test_search_within_file_content(self, drive_service):
         """Test searching within a specific file."""
-        with patch('src.tools.drive_tools.get_credentials') as mock_creds, \
-             patch('src.tools.drive_tools.build') as mock_build, \
-             patch('src.tools.drive_tools._extract_file_content_for_search') as mock_extract:
+        with patch('src.tools.drive_tools._extract_file_content_for_search') as mock_extract:
             
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
+            mock_service = drive_service
             
             # Mock file metadata
             mock_service.files().get().execute.return_value = {
@@ -141,6 +181,173 @@ class TestContentSearch:
             assert result_data["has_matches"] is True
             assert result_data["match_count"] == 1
 
+    async def test_extract_pdf_content_parses_in_pdf_pool(self):
+        """Test that downloaded PDF bytes are handed to the PDF worker pool for parsing."""
+        import PyPDF2
+        
+        writer = PyPDF2.PdfWriter()
+        writer.add_blank_page(width=72, height=72)
+        pdf_bytes = io.BytesIO()
+        writer.write(pdf_bytes)
+        
+        def _fake_download(fh, request, **kwargs):
+            fh.write(pdf_bytes.getvalue())
+            downloader = Mock()
+            downloader.next_chunk.return_value = (None, True)
+            return downloader
+        
+        with ThreadPoolExecutor(max_workers=1) as pool, \
+             patch('src.tools.drive_tools.MediaIoBaseDownload', side_effect=_fake_download), \
+             patch('src.tools.drive_tools._get_pdf_pool', return_value=pool) as mock_get_pool:
+            
+            content = await _extract_pdf_content(Mock(), "file123")
+        
+        assert content == "\n"
+        mock_get_pool.assert_called_once()
+
+    async def test_extract_pdf_content_replaces_broken_pdf_pool(self):
+        """Test that a broken PDF worker pool is discarded and the parse retried once."""
+        import PyPDF2
+        from concurrent.futures.process import BrokenProcessPool
+        from src.tools import drive_tools
+        
+        writer = PyPDF2.PdfWriter()
+        writer.add_blank_page(width=72, height=72)
+        pdf_bytes = io.BytesIO()
+        writer.write(pdf_bytes)
+        
+        def _fake_download(fh, request, **kwargs):
+            fh.write(pdf_bytes.getvalue())
+            downloader = Mock()
+            downloader.next_chunk.return_value = (None, True)
+            return downloader
+        
+        broken_pool = Mock()
+        broken_pool.submit.side_effect = BrokenProcessPool("worker died")
+        
+        with ThreadPoolExecutor(max_workers=1) as pool, \
+             patch('src.tools.drive_tools.MediaIoBaseDownload', side_effect=_fake_download), \
+             patch.object(drive_tools, '_PDF_POOL', broken_pool), \
+             patch('src.tools.drive_tools.ProcessPoolExecutor', return_value=pool) as mock_pool_cls:
+            
+            content = await _extract_pdf_content(Mock(), "file123")
+            
+            assert drive_tools._PDF_POOL is pool
+        
+        assert content == "\n"
+        broken_pool.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        mock_pool_cls.assert_called_once()
+
+    async def test_get_drive_file_details_requests_field_mask(self, drive_service):
+        """Test that file details request only the fields they return unless verbose."""
+        mock_service = drive_service
+        mock_service.files().get().execute.return_value = {
+            "id": "file123",
+            "name": "notes.pdf",
+            "mimeType": "application/pdf"
+        }
+        
+        result_data = json.loads(await get_drive_file_details("file123"))
+        assert mock_service.files().get.call_args[1]["fields"] == "id, name, mimeType, createdTime, modifiedTime"
+        assert "metadata" not in result_data
+        
+        result_data = json.loads(await get_drive_file_details("file123", verbose=True))
+        assert mock_service.files().get.call_args[1]["fields"] == "*"
+        assert result_data["metadata"]["name"] == "notes.pdf"
+
+    async def test_search_within_file_content_reuses_speculative_export(self, drive_service):
+        """Test that a Google Doc exported alongside the metadata request is not downloaded again."""
+        with patch('src.tools.drive_tools._export_text', return_value="some test content") as mock_export, \
+             patch('src.tools.drive_tools.get_cached_content', return_value=None), \
+             patch('src.tools.drive_tools.set_cached_content'):
+            
+            mock_service = drive_service
+            mock_service.files().get().execute.return_value = {
+                "id": "doc123",
+                "name": "Notes",
+                "mimeType": "application/vnd.google-apps.document",
+                "modifiedTime": "2023-01-02T00:00:00Z"
+            }
+            
+            result = await search_within_file_content(
+                "doc123", "test", mime_type="application/vnd.google-apps.document"
+            )
+            result_data = json.loads(result)
+            
+            assert result_data["has_matches"] is True
+            assert result_data["match_count"] == 1
+            mock_export.assert_called_once()
+
+    async def test_get_drive_file_details_skips_export_unless_google_apps_expected(self, drive_service):
+        """Test that files of unknown type are not speculatively exported."""
+        with patch('src.tools.drive_tools._export_text') as mock_export:
+            mock_service = drive_service
+            mock_service.files().get().execute.return_value = {"id": "file123", "name": "notes"}
+            
+            result_data = json.loads(await get_drive_file_details("file123"))
+            
+            assert result_data["mimeType"] is None
+            assert result_data["content"] is None
+            mock_export.assert_not_called()
+
+    async def test_get_drive_file_details_exports_google_apps_file_after_metadata(self, drive_service):
+        """Test that a Google Doc of unknown type is exported once its type is known."""
+        with patch('src.tools.drive_tools._export_text', return_value="doc text") as mock_export:
+            mock_service = drive_service
+            mock_service.files().get().execute.return_value = {
+                "id": "doc123",
+                "name": "Notes",
+                "mimeType": "application/vnd.google-apps.document"
+            }
+            
+            result_data = json.loads(await get_drive_file_details("doc123"))
+            
+            assert result_data["content"] == "doc text"
+            mock_export.assert_called_once_with(mock_service, "doc123")
+
+    async def test_extract_file_content_trusts_server_match_for_text_files(self):
+        """Test that server-matched text files are only fetched up to a prefix."""
+        with patch('src.tools.drive_tools.get_cached_content', return_value=None), \
+             patch('src.tools.drive_tools.set_cached_content') as mock_set_cache:
+            
+            mock_service = Mock()
+            mock_request = Mock(headers={})
+            mock_request.execute.return_value = b"a test in the first bytes"
+            mock_service.files().get_media.return_value = mock_request
+            
+            content_info = await _extract_file_content_for_search(
+                mock_service, "file1", "text/plain", "test", False, False,
+                trust_server_match=True
+            )
+            
+            assert content_info["has_matches"] is True
+            assert content_info["match_count"] == 1
+            assert mock_request.headers["Range"] == "bytes=0-65535"
+            mock_set_cache.assert_not_called()
+
+    async def test_extract_file_content_downloads_full_text_when_prefix_has_no_match(self):
+        """Test that a server match missing from the prefix is searched in the full file."""
+        with patch('src.tools.drive_tools.get_cached_content', return_value=None), \
+             patch('src.tools.drive_tools.set_cached_content') as mock_set_cache, \
+             patch('src.tools.drive_tools._extract_text_content',
+                   return_value="no match in the first bytes... but a test later") as mock_full:
+            
+            mock_service = Mock()
+            mock_request = Mock(headers={})
+            mock_request.execute.return_value = b"no match in the first bytes"
+            mock_service.files().get_media.return_value = mock_request
+            
+            content_info = await _extract_file_content_for_search(
+                mock_service, "file1", "text/plain", "test", False, False,
+                trust_server_match=True
+            )
+            
+            assert content_info["has_matches"] is True
+            assert content_info["match_count"] == 1
+            assert "test later" in content_info["snippets"][0]["text"]
+            mock_full.assert_called_once_with(mock_service, "file1")
+            mock_set_cache.assert_called_once()
+
     def test_find_content_matches_simple(self):
         """Test simple string matching."""
         content = "This is a test document with test content"
@@ -158,6 +365,13 @@ class TestContentSearch:
         assert len(matches) == 1
         assert matches[0] == (10, 14)  # Only "Test"
 
+    def test_find_content_matches_escapes_plain_text(self):
+        """Test that plain-text search treats regex metacharacters literally."""
+        content = "Version A.B and AxB"
+        matches = _find_content_matches(content, "a.b", case_sensitive=False, use_regex=False)
+        
+        assert matches == [(8, 11)]
+
     def test_find_content_matches_regex(self):
         """Test regex pattern matching."""
         content = "test123 test456 test789"
@@ -176,6 +390,59 @@ class TestContentSearch:
         # Invalid regex should return no matches (not fall back to string search)
         assert len(matches) == 0
 
+    def test_find_content_matches_invalid_regex_compiled_once(self):
+        """Test that an invalid regex is not re-parsed for every file searched."""
+        with patch("src.tools.drive_tools.re.compile", wraps=re.compile) as mock_compile:
+            for content in ("first file", "second file", "third file"):
+                _find_content_matches(content, "(unclosed", case_sensitive=False, use_regex=True)
+        
+        # One failed compile, plus one for the escaped fallback pattern
+        assert mock_compile.call_count == 2
+
+    def test_find_content_matches_regex_uses_re2_when_installed(self):
+        """Test that user regexes go through google-re2 when it is installed, with re as the fallback."""
+        fake_re2 = Mock(error=ValueError)
+        fake_re2.compile.side_effect = lambda pattern: re.compile(pattern)
+        # Compiled patterns are cached, so start and end with a cold cache
+        _compile_user_regex.cache_clear()
+        with patch.dict(sys.modules, {"re2": fake_re2}):
+            matches = _find_content_matches("Test TEST", r"te.t", case_sensitive=False, use_regex=True)
+            fake_re2.compile.side_effect = ValueError("lookarounds are not supported")
+            fallback = _find_content_matches("test tester", r"test(?!er)", case_sensitive=True, use_regex=True)
+        _compile_user_regex.cache_clear()
+        
+        assert matches == [(0, 4), (5, 9)]
+        assert fake_re2.compile.call_args_list[0].args == ("(?i)te.t",)
+        assert fallback == [(0, 4)]
+
+    def test_find_content_matches_multiple_terms(self):
+        """Test that several plain-text terms are matched in one pass, in order."""
+        content = "Budget review, then the ROADMAP and budget sign-off"
+        matches = _find_content_matches(content, "budget", case_sensitive=False, use_regex=False, search_terms=("roadmap",))
+        
+        assert matches == [(0, 6), (24, 31), (36, 42)]
+
+    def test_find_content_matches_multiple_terms_without_ahocorasick(self):
+        """Test the regex alternation fallback when pyahocorasick is not installed."""
+        content = "Budget review, then the ROADMAP and budget sign-off"
+        with patch('src.tools.drive_tools._build_automaton', return_value=None):
+            matches = _find_content_matches(content, "budget", case_sensitive=False, use_regex=False, search_terms=("roadmap",))
+        
+        assert matches == [(0, 6), (24, 31), (36, 42)]
+
+    def test_find_content_matches_multiple_terms_same_with_and_without_ahocorasick(self):
+        """Test that both multi-term paths report identical, non-overlapping matches."""
+        # "İ" lowercases to two characters, and the terms overlap each other
+        content = "İstanbul plan: the roadmap review, then a roadmapping review."
+        terms = ("road", "roadmap", "map review", "review")
+        
+        matches = _find_content_matches(content, terms[0], case_sensitive=False, use_regex=False, search_terms=terms[1:])
+        with patch('src.tools.drive_tools._build_automaton', return_value=None):
+            fallback_matches = _find_content_matches(content, terms[0], case_sensitive=False, use_regex=False, search_terms=terms[1:])
+        
+        assert matches == fallback_matches
+        assert [content[start:end] for start, end in matches] == ["roadmap", "review", "roadmap", "review"]
+
     def test_generate_search_snippets(self):
         """Test snippet generation around matches."""
         content = "This is a long document with some test content that contains multiple test words"
@@ -190,6 +457,44 @@ class TestContentSearch:
         assert "hat contains multiple te" in snippet_texts[1]
         assert snippets[0]["match_start"] < snippets[0]["match_end"]
 
+    def test_generate_search_snippets_merges_overlapping_windows(self):
+        """Test that matches close together share one snippet."""
+        content = "test test" + " " * 100 + "test"
+        matches = _find_content_matches(content, "test", case_sensitive=False, use_regex=False)
+        
+        snippets = _generate_search_snippets(content, matches, snippet_length=10)
+        
+        assert len(snippets) == 2
+        assert snippets[0]["text"] == content[0:14]
+        assert snippets[0]["original_start"] == 0
+        assert snippets[1]["original_start"] == 109
+
+    def test_generate_search_snippets_bounds_dense_matches(self):
+        """Test that dense matches do not merge into one snippet covering the whole file."""
+        content = "row with budget value 123; " * 2000
+        matches = _find_content_matches(content, "budget", case_sensitive=False, use_regex=False)
+        
+        snippets = _generate_search_snippets(content, matches, snippet_length=200, max_snippets=20)
+        
+        assert len(snippets) == 20
+        assert all(len(snippet["text"]) <= 200 + len("budget") for snippet in snippets)
+        for snippet in snippets:
+            assert snippet["text"][snippet["match_start"]:snippet["match_end"]] == "budget"
+        # Consecutive snippets do not repeat text
+        assert all(
+            previous["original_start"] < current["original_start"]
+            for previous, current in zip(snippets, snippets[1:])
+        )
+
+    def test_generate_search_snippets_max_snippets(self):
+        """Test that snippet generation stops at max_snippets."""
+        content = (" " * 10).join(["test"] * 50)
+        matches = _find_content_matches(content, "test", case_sensitive=False, use_regex=False)
+        
+        snippets = _generate_search_snippets(content, matches, snippet_length=2, max_snippets=3)
+        
+        assert len(snippets) == 3
+
     def test_generate_search_snippets_edge_cases(self):
         """Test snippet generation with edge cases."""
         content = "short"
@@ -202,46 +507,34 @@ class TestContentSearch:
         assert snippets[0]["match_start"] == 0
         assert snippets[0]["match_end"] == 5
 
-    @pytest.mark.asyncio
-    async def test_search_drive_by_content_error_handling(self):
+    async def test_search_drive_by_content_error_handling(self, drive_service):
         """Test error handling in content search."""
-        with patch('src.tools.drive_tools.get_credentials') as mock_creds, \
-             patch('src.tools.drive_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            # Mock API error
-            from googleapiclient.errors import HttpError
-            mock_service.files().list().execute.side_effect = HttpError(
-                resp=Mock(status=500), content=b"Internal Server Error"
-            )
-            
-            result = await search_drive_by_content("test")
-            result_data = json.loads(result)
-            
-            assert "error" in result_data
-            assert "An error occurred" in result_data["error"]
+        mock_service = drive_service
+        
+        # Mock API error
+        from googleapiclient.errors import HttpError
+        mock_service.files().list().execute.side_effect = HttpError(
+            resp=Mock(status=500), content=b"Internal Server Error"
+        )
+        
+        result = await search_drive_by_content("test")
+        result_data = json.loads(result)
+        
+        assert "error" in result_data
+        assert "An error occurred" in result_data["error"]
 
-    @pytest.mark.asyncio
-    async def test_search_within_file_content_error_handling(self):
+    async def test_search_within_file_content_error_handling(self, drive_service):
         """Test error handling in single file search."""
-        with patch('src.tools.drive_tools.get_credentials') as mock_creds, \
-             patch('src.tools.drive_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            # Mock API error
-            from googleapiclient.errors import HttpError
-            mock_service.files().get().execute.side_effect = HttpError(
-                resp=Mock(status=404), content=b"File not found"
-            )
-            
-            result = await search_within_file_content("invalid_id", "test")
-            result_data = json.loads(result)
-            
-            assert "error" in result_data
-            assert "An error occurred" in result_data["error"]
+        mock_service = drive_service
+        
+        # Mock API error
+        from googleapiclient.errors import HttpError
+        mock_service.files().get().execute.side_effect = HttpError(
+            resp=Mock(status=404), content=b"File not found"
+        )
+        
+        result = await search_within_file_content("invalid_id", "test")
+        result_data = json.loads(result)
+        
+        assert "error" in result_data
+        assert "An error occurred" in result_data["error"]
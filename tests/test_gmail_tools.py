@@ -1,7 +1,8 @@
-import pytest
 import json
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import Mock
 from src.tools.gmail_tools import (
+    _decode_body,
+    _invalidate_labels_cache,
     search_gmail,
     list_gmail_labels,
     search_gmail_labels,
@@ -14,337 +15,461 @@ from src.tools.gmail_tools import (
 class TestGmailLabels:
     """Test cases for Gmail label functionality."""
 
-    @pytest.mark.asyncio
-    async def test_list_gmail_labels(self):
+    async def test_list_gmail_labels(self, gmail_service):
         """Test listing all Gmail labels."""
-        with patch('src.tools.gmail_tools.get_credentials') as mock_creds, \
-             patch('src.tools.gmail_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            # Mock labels response
-            mock_labels = [
-                {
-                    "id": "INBOX",
-                    "name": "INBOX",
-                    "type": "system",
-                    "messageListVisibility": "show",
-                    "labelListVisibility": "labelShow",
-                    "messagesTotal": 150,
-                    "messagesUnread": 5
-                },
-                {
-                    "id": "Label_123",
-                    "name": "Work",
-                    "type": "user",
-                    "messageListVisibility": "show",
-                    "labelListVisibility": "labelShow",
-                    "messagesTotal": 25,
-                    "messagesUnread": 2
-                }
-            ]
-            
-            mock_service.users().labels().list().execute.return_value = {"labels": mock_labels}
-            
-            result = await list_gmail_labels()
-            result_data = json.loads(result)
-            
-            assert "labels" in result_data
-            assert len(result_data["labels"]) == 2
-            assert result_data["total_labels"] == 2
-            assert result_data["labels"][0]["id"] == "INBOX"
-            assert result_data["labels"][1]["name"] == "Work"
-
-    @pytest.mark.asyncio
-    async def test_search_gmail_labels_with_query(self):
-        """Test searching labels with a query."""
-        with patch('src.tools.gmail_tools.get_credentials') as mock_creds, \
-             patch('src.tools.gmail_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            # Mock all labels
-            mock_labels = [
-                {"id": "Label_1", "name": "Work", "type": "user"},
-                {"id": "Label_2", "name": "Personal", "type": "user"},
-                {"id": "Label_3", "name": "Work Projects", "type": "user"}
-            ]
-            
-            mock_service.users().labels().list().execute.return_value = {"labels": mock_labels}
-            
-            result = await search_gmail_labels("work")
-            result_data = json.loads(result)
-            
-            assert "labels" in result_data
-            assert len(result_data["labels"]) == 2  # "Work" and "Work Projects"
-            assert result_data["query"] == "work"
-            assert all("work" in label["name"].lower() for label in result_data["labels"])
-
-    @pytest.mark.asyncio
-    async def test_search_gmail_labels_empty_query(self):
-        """Test searching labels with empty query returns all labels."""
-        with patch('src.tools.gmail_tools.get_credentials') as mock_creds, \
-             patch('src.tools.gmail_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            mock_labels = [
-                {"id": "Label_1", "name": "Work", "type": "user"},
-                {"id": "Label_2", "name": "Personal", "type": "user"}
-            ]
-            
-            mock_service.users().labels().list().execute.return_value = {"labels": mock_labels}
-            
-            result = await search_gmail_labels("")
-            result_data = json.loads(result)
-            
-            assert len(result_data["labels"]) == 2
-            assert result_data["query"] == ""
-
-    @pytest.mark.asyncio
-    async def test_get_gmail_label_details(self):
-        """Test getting details for a specific label."""
-        with patch('src.tools.gmail_tools.get_credentials') as mock_creds, \
-             patch('src.tools.gmail_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            mock_label = {
+        mock_service = gmail_service
+        
+        # Mock labels response
+        mock_labels = [
+            {
+                "id": "INBOX",
+                "name": "INBOX",
+                "type": "system",
+                "messageListVisibility": "show",
+                "labelListVisibility": "labelShow",
+                "messagesTotal": 150,
+                "messagesUnread": 5
+            },
+            {
                 "id": "Label_123",
                 "name": "Work",
                 "type": "user",
                 "messageListVisibility": "show",
                 "labelListVisibility": "labelShow",
                 "messagesTotal": 25,
-                "messagesUnread": 2,
-                "threadsTotal": 15,
-                "threadsUnread": 1
+                "messagesUnread": 2
             }
-            
-            mock_service.users().labels().get().execute.return_value = mock_label
-            
-            result = await get_gmail_label_details("Label_123")
-            result_data = json.loads(result)
-            
-            assert result_data["id"] == "Label_123"
-            assert result_data["name"] == "Work"
-            assert result_data["messagesTotal"] == 25
-            assert result_data["messagesUnread"] == 2
-            assert result_data["threadsTotal"] == 15
-            assert result_data["threadsUnread"] == 1
+        ]
+        
+        mock_service.users().labels().list().execute.return_value = {"labels": mock_labels}
+        
+        result = await list_gmail_labels()
+        result_data = json.loads(result)
+        
+        assert "labels" in result_data
+        assert len(result_data["labels"]) == 2
+        assert result_data["total_labels"] == 2
+        assert result_data["labels"][0]["id"] == "INBOX"
+        assert result_data["labels"][1]["name"] == "Work"
+        assert mock_service.users().labels().list.call_args[1]["fields"].startswith("labels(id,name,")
 
-    @pytest.mark.asyncio
-    async def test_search_gmail_by_label(self):
-        """Test searching messages within a specific label."""
-        with patch('src.tools.gmail_tools.get_credentials') as mock_creds, \
-             patch('src.tools.gmail_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            # Mock messages in label
-            mock_messages = [
-                {"id": "msg1"},
-                {"id": "msg2"}
+    async def test_label_list_is_reused_until_invalidated(self, gmail_service):
+        """Test that label listings and searches share one cached labels.list call."""
+        mock_service = gmail_service
+        mock_service.users().labels().list().execute.return_value = {
+            "labels": [{"id": "INBOX", "name": "INBOX", "type": "system"}]
+        }
+        mock_service.users().labels().list.reset_mock()
+        
+        await list_gmail_labels()
+        result = await search_gmail_labels("inbox")
+        assert json.loads(result)["total_labels"] == 1
+        assert mock_service.users().labels().list.call_count == 1
+        
+        _invalidate_labels_cache()
+        await list_gmail_labels()
+        assert mock_service.users().labels().list.call_count == 2
+
+    async def test_search_gmail_labels_treats_query_literally(self, gmail_service):
+        """Test that label search is case-insensitive and ignores regex syntax."""
+        mock_service = gmail_service
+        mock_service.users().labels().list().execute.return_value = {
+            "labels": [
+                {"id": "Label_1", "name": "C++ Projects"},
+                {"id": "Label_2", "name": "CPP"}
             ]
-            
-            mock_service.users().messages().list().execute.return_value = {"messages": mock_messages}
-            
-            # Mock individual message details
-            def mock_get_message(userId, id):
-                mock_msg = Mock()
-                if id == "msg1":
-                    mock_msg.execute.return_value = {
-                        "id": "msg1",
-                        "payload": {
-                            "headers": [
-                                {"name": "Subject", "value": "Test Email 1"},
-                                {"name": "From", "value": "sender1@example.com"},
-                                {"name": "Date", "value": "2023-01-01"}
-                            ]
-                        },
-                        "labelIds": ["Label_123", "INBOX"],
-                        "snippet": "This is a test email"
-                    }
-                else:
-                    mock_msg.execute.return_value = {
-                        "id": "msg2",
-                        "payload": {
-                            "headers": [
-                                {"name": "Subject", "value": "Test Email 2"},
-                                {"name": "From", "value": "sender2@example.com"},
-                                {"name": "Date", "value": "2023-01-02"}
-                            ]
-                        },
-                        "labelIds": ["Label_123"],
-                        "snippet": "Another test email"
-                    }
-                return mock_msg
-            
-            mock_service.users().messages().get.side_effect = mock_get_message
-            
-            result = await search_gmail_by_label("Label_123", "test")
-            result_data = json.loads(result)
-            
-            assert "messages" in result_data
-            assert len(result_data["messages"]) == 2
-            assert result_data["label_id"] == "Label_123"
-            assert result_data["query"] == "test"
-            assert result_data["total_results"] == 2
+        }
+        
+        result_data = json.loads(await search_gmail_labels("c++"))
+        
+        assert [label["id"] for label in result_data["labels"]] == ["Label_1"]
+
+    async def test_search_gmail_labels_with_query(self, gmail_service):
+        """Test searching labels with a query."""
+        mock_service = gmail_service
+        
+        # Mock all labels
+        mock_labels = [
+            {"id": "Label_1", "name": "Work", "type": "user"},
+            {"id": "Label_2", "name": "Personal", "type": "user"},
+            {"id": "Label_3", "name": "Work Projects", "type": "user"}
+        ]
+        
+        mock_service.users().labels().list().execute.return_value = {"labels": mock_labels}
+        
+        result = await search_gmail_labels("work")
+        result_data = json.loads(result)
+        
+        assert "labels" in result_data
+        assert len(result_data["labels"]) == 2  # "Work" and "Work Projects"
+        assert result_data["query"] == "work"
+        assert all("work" in label["name"].lower() for label in result_data["labels"])
+
+    async def test_search_gmail_labels_empty_query(self, gmail_service):
+        """Test searching labels with empty query returns all labels."""
+        mock_service = gmail_service
+        
+        mock_labels = [
+            {"id": "Label_1", "name": "Work", "type": "user"},
+            {"id": "Label_2", "name": "Personal", "type": "user"}
+        ]
+        
+        mock_service.users().labels().list().execute.return_value = {"labels": mock_labels}
+        
+        result = await search_gmail_labels("")
+        result_data = json.loads(result)
+        
+        assert len(result_data["labels"]) == 2
+        assert result_data["query"] == ""
+
+    async def test_get_gmail_label_details(self, gmail_service):
+        """Test getting details for a specific label."""
+        mock_service = gmail_service
+        
+        mock_label = {
+            "id": "Label_123",
+            "name": "Work",
+            "type": "user",
+            "messageListVisibility": "show",
+            "labelListVisibility": "labelShow",
+            "messagesTotal": 25,
+            "messagesUnread": 2,
+            "threadsTotal": 15,
+            "threadsUnread": 1
+        }
+        
+        mock_service.users().labels().get().execute.return_value = mock_label
+        
+        result = await get_gmail_label_details("Label_123")
+        result_data = json.loads(result)
+        
+        assert result_data["id"] == "Label_123"
+        assert result_data["name"] == "Work"
+        assert result_data["messagesTotal"] == 25
+        assert result_data["messagesUnread"] == 2
+        assert result_data["threadsTotal"] == 15
+        assert result_data["threadsUnread"] == 1
 
-    @pytest.mark.asyncio
-    async def test_search_gmail_with_label_filter(self):
+    async def test_search_gmail_by_label(self, gmail_service, fake_batch):
+        """Test searching messages within a specific label."""
+        mock_service = gmail_service
+        mock_service.new_batch_http_request.side_effect = fake_batch
+        
+        # Mock messages in label
+        mock_messages = [
+            {"id": "msg1"},
+            {"id": "msg2"}
+        ]
+        
+        mock_service.users().messages().list().execute.return_value = {"messages": mock_messages}
+        
+        # Mock individual message details
+        def mock_get_message(userId, id, **kwargs):
+            mock_msg = Mock()
+            if id == "msg1":
+                mock_msg.execute.return_value = {
+                    "id": "msg1",
+                    "payload": {
+                        "headers": [
+                            {"name": "Subject", "value": "Test Email 1"},
+                            {"name": "From", "value": "sender1@example.com"},
+                            {"name": "Date", "value": "2023-01-01"}
+                        ]
+                    },
+                    "labelIds": ["Label_123", "INBOX"],
+                    "snippet": "This is a test email"
+                }
+            else:
+                mock_msg.execute.return_value = {
+                    "id": "msg2",
+                    "payload": {
+                        "headers": [
+                            {"name": "Subject", "value": "Test Email 2"},
+                            {"name": "From", "value": "sender2@example.com"},
+                            {"name": "Date", "value": "2023-01-02"}
+                        ]
+                    },
+                    "labelIds": ["Label_123"],
+                    "snippet": "Another test email"
+                }
+            return mock_msg
+        
+        mock_service.users().messages().get.side_effect = mock_get_message
+        
+        result = await search_gmail_by_label("Label_123", "test")
+        result_data = json.loads(result)
+        
+        assert "messages" in result_data
+        assert len(result_data["messages"]) == 2
+        assert result_data["label_id"] == "Label_123"
+        assert result_data["query"] == "test"
+        assert result_data["total_results"] == 2
+
+    async def test_search_gmail_with_label_filter(self, gmail_service, fake_batch):
         """Test searching Gmail with label filter."""
-        with patch('src.tools.gmail_tools.get_credentials') as mock_creds, \
-             patch('src.tools.gmail_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            # Mock messages
-            mock_messages = [{"id": "msg1"}]
-            mock_service.users().messages().list().execute.return_value = {"messages": mock_messages}
-            
-            # Mock message details
-            mock_service.users().messages().get().execute.return_value = {
-                "id": "msg1",
-                "payload": {
-                    "headers": [
-                        {"name": "Subject", "value": "Test Email"},
-                        {"name": "From", "value": "sender@example.com"},
-                        {"name": "Date", "value": "2023-01-01"}
-                    ]
-                },
-                "labelIds": ["INBOX", "Label_123"],
-                "snippet": "Test email content"
-            }
-            
-            result = await search_gmail("test", label_ids=["INBOX"])
-            result_data = json.loads(result)
-            
-            assert "messages" in result_data
-            assert len(result_data["messages"]) == 1
-            assert result_data["label_ids"] == ["INBOX"]
-            assert result_data["query"] == "test"
+        mock_service = gmail_service
+        mock_service.new_batch_http_request.side_effect = fake_batch
+        
+        # Mock messages
+        mock_messages = [{"id": "msg1"}]
+        mock_service.users().messages().list().execute.return_value = {"messages": mock_messages}
+        
+        # Mock message details
+        mock_service.users().messages().get().execute.return_value = {
+            "id": "msg1",
+            "payload": {
+                "headers": [
+                    {"name": "Subject", "value": "Test Email"},
+                    {"name": "From", "value": "sender@example.com"},
+                    {"name": "Date", "value": "2023-01-01"}
+                ]
+            },
+            "labelIds": ["INBOX", "Label_123"],
+            "snippet": "Test email content"
+        }
+        
+        result = await search_gmail("test", label_ids=["INBOX"])
+        result_data = json.loads(result)
+        
+        assert "messages" in result_data
+        assert len(result_data["messages"]) == 1
+        assert result_data["label_ids"] == ["INBOX"]
+        assert result_data["query"] == "test"
 
-    @pytest.mark.asyncio
-    async def test_search_gmail_without_label_filter(self):
+    async def test_search_gmail_without_label_filter(self, gmail_service, fake_batch):
         """Test searching Gmail without label filter."""
-        with patch('src.tools.gmail_tools.get_credentials') as mock_creds, \
-             patch('src.tools.gmail_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            mock_messages = [{"id": "msg1"}]
-            mock_service.users().messages().list().execute.return_value = {"messages": mock_messages}
-            
-            mock_service.users().messages().get().execute.return_value = {
-                "id": "msg1",
-                "payload": {
-                    "headers": [
-                        {"name": "Subject", "value": "Test Email"},
-                        {"name": "From", "value": "sender@example.com"},
-                        {"name": "Date", "value": "2023-01-01"}
-                    ]
-                },
-                "labelIds": ["INBOX"],
-                "snippet": "Test email content"
-            }
-            
-            result = await search_gmail("test")
-            result_data = json.loads(result)
-            
-            assert "messages" in result_data
-            assert result_data["label_ids"] is None
-            assert result_data["query"] == "test"
+        mock_service = gmail_service
+        mock_service.new_batch_http_request.side_effect = fake_batch
+        
+        mock_messages = [{"id": "msg1"}]
+        mock_service.users().messages().list().execute.return_value = {"messages": mock_messages}
+        
+        mock_service.users().messages().get().execute.return_value = {
+            "id": "msg1",
+            "payload": {
+                "headers": [
+                    {"name": "Subject", "value": "Test Email"},
+                    {"name": "From", "value": "sender@example.com"},
+                    {"name": "Date", "value": "2023-01-01"}
+                ]
+            },
+            "labelIds": ["INBOX"],
+            "snippet": "Test email content"
+        }
+        
+        result = await search_gmail("test")
+        result_data = json.loads(result)
+        
+        assert "messages" in result_data
+        assert result_data["label_ids"] is None
+        assert result_data["query"] == "test"
+
+    async def test_search_gmail_reuses_cached_result(self, gmail_service, fake_batch):
+        """Test that an identical search is served from the query cache unless no_cache is set."""
+        mock_service = gmail_service
+        mock_service.new_batch_http_request.side_effect = fake_batch
+        mock_service.users().messages().list().execute.return_value = {"messages": []}
+        mock_service.users().messages().list.reset_mock()
+        
+        first = await search_gmail("test")
+        second = await search_gmail("test")
+        assert first == second
+        assert mock_service.users().messages().list.call_count == 1
+        
+        await search_gmail("test", no_cache=True)
+        assert mock_service.users().messages().list.call_count == 2
+
+    async def test_search_gmail_ids_only_skips_metadata_fetch(self, gmail_service):
+        """Test that ids_only returns the listed IDs without fetching each message."""
+        mock_service = gmail_service
+        mock_service.users().messages().list().execute.return_value = {
+            "messages": [{"id": "msg1"}, {"id": "msg2"}]
+        }
+        
+        result = await search_gmail("report", ids_only=True)
+        result_data = json.loads(result)
+        
+        assert result_data["messages"] == [{"id": "msg1"}, {"id": "msg2"}]
+        assert mock_service.users().messages().list.call_args[1]["fields"] == "messages(id)"
+        mock_service.new_batch_http_request.assert_not_called()
 
-    @pytest.mark.asyncio
-    async def test_get_gmail_message_details_with_labels(self):
+    async def test_get_gmail_message_details_with_labels(self, gmail_service):
         """Test getting message details includes labels."""
-        with patch('src.tools.gmail_tools.get_credentials') as mock_creds, \
-             patch('src.tools.gmail_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            mock_service.users().messages().get().execute.return_value = {
-                "id": "msg1",
-                "payload": {
-                    "headers": [
-                        {"name": "Subject", "value": "Test Email"},
-                        {"name": "From", "value": "sender@example.com"},
-                        {"name": "To", "value": "recipient@example.com"},
-                        {"name": "Date", "value": "2023-01-01"}
-                    ],
-                    "body": {
-                        "data": "VGVzdCBib2R5IGNvbnRlbnQ="  # base64 encoded "Test body content"
-                    }
-                },
-                "labelIds": ["INBOX", "Label_123"],
-                "snippet": "Test email snippet"
+        mock_service = gmail_service
+        
+        mock_service.users().messages().get().execute.return_value = {
+            "id": "msg1",
+            "payload": {
+                "headers": [
+                    {"name": "Subject", "value": "Test Email"},
+                    {"name": "From", "value": "sender@example.com"},
+                    {"name": "To", "value": "recipient@example.com"},
+                    {"name": "Date", "value": "2023-01-01"}
+                ],
+                "body": {
+                    "data": "VGVzdCBib2R5IGNvbnRlbnQ="  # base64 encoded "Test body content"
+                }
+            },
+            "labelIds": ["INBOX", "Label_123"],
+            "snippet": "Test email snippet"
+        }
+        
+        result = await get_gmail_message_details("msg1")
+        result_data = json.loads(result)
+        
+        assert result_data["id"] == "msg1"
+        assert result_data["subject"] == "Test Email"
+        assert result_data["from"] == "sender@example.com"
+        assert result_data["labels"] == ["INBOX", "Label_123"]
+        assert result_data["snippet"] == "Test email snippet"
+
+    async def test_get_gmail_message_details_requests_partial_response(self, gmail_service):
+        """Test that message details use a fields mask and tolerate omitted bodies."""
+        mock_service = gmail_service
+        
+        # A partial response drops the empty body object of an HTML-only part
+        mock_service.users().messages().get().execute.return_value = {
+            "id": "msg1",
+            "payload": {
+                "headers": [{"name": "Subject", "value": "Test Email"}],
+                "parts": [{"mimeType": "text/html"}]
             }
-            
-            result = await get_gmail_message_details("msg1")
-            result_data = json.loads(result)
-            
-            assert result_data["id"] == "msg1"
-            assert result_data["subject"] == "Test Email"
-            assert result_data["from"] == "sender@example.com"
-            assert result_data["labels"] == ["INBOX", "Label_123"]
-            assert result_data["snippet"] == "Test email snippet"
+        }
+        
+        result = await get_gmail_message_details("msg1")
+        result_data = json.loads(result)
+        
+        assert result_data["subject"] == "Test Email"
+        assert result_data["body"] == ""
+        get_kwargs = mock_service.users().messages().get.call_args[1]
+        assert get_kwargs["format"] == "full"
+        assert "payload(headers" in get_kwargs["fields"]
 
-    @pytest.mark.asyncio
-    async def test_gmail_error_handling(self):
+    async def test_gmail_error_handling(self, gmail_service):
         """Test error handling in Gmail operations."""
-        with patch('src.tools.gmail_tools.get_credentials') as mock_creds, \
-             patch('src.tools.gmail_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            # Mock API error
-            from googleapiclient.errors import HttpError
-            mock_service.users().labels().list().execute.side_effect = HttpError(
-                resp=Mock(status=500), content=b"Internal Server Error"
-            )
-            
-            result = await list_gmail_labels()
-            result_data = json.loads(result)
-            
-            assert "error" in result_data
-            assert "An error occurred" in result_data["error"]
+        mock_service = gmail_service
+        
+        # Mock API error
+        from googleapiclient.errors import HttpError
+        mock_service.users().labels().list().execute.side_effect = HttpError(
+            resp=Mock(status=500), content=b"Internal Server Error"
+        )
+        
+        result = await list_gmail_labels()
+        result_data = json.loads(result)
+        
+        assert "error" in result_data
+        assert "An error occurred" in result_data["error"]
 
-    @pytest.mark.asyncio
-    async def test_search_gmail_by_label_empty_results(self):
+    async def test_search_gmail_by_label_empty_results(self, gmail_service):
         """Test searching by label with no results."""
-        with patch('src.tools.gmail_tools.get_credentials') as mock_creds, \
-             patch('src.tools.gmail_tools.build') as mock_build:
-            
-            mock_creds.return_value = Mock()
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            
-            mock_service.users().messages().list().execute.return_value = {"messages": []}
-            
-            result = await search_gmail_by_label("Label_123", "nonexistent")
-            result_data = json.loads(result)
-            
-            assert "messages" in result_data
-            assert len(result_data["messages"]) == 0
-            assert result_data["total_results"] == 0
-            assert result_data["label_id"] == "Label_123"
-            assert result_data["query"] == "nonexistent"
+        mock_service = gmail_service
+        
+        mock_service.users().messages().list().execute.return_value = {"messages": []}
+        
+        result = await search_gmail_by_label("Label_123", "nonexistent")
+        result_data = json.loads(result)
+        
+        assert "messages" in result_data
+        assert len(result_data["messages"]) == 0
+        assert result_data["total_results"] == 0
+        assert result_data["label_id"] == "Label_123"
+        assert result_data["query"] == "nonexistent"
+
+    async def test_search_gmail_tolerates_message_without_payload(self, gmail_service, fake_batch):
+        """Test that a message with none of the requested headers, and so no payload, is still listed."""
+        mock_service = gmail_service
+        mock_service.new_batch_http_request.side_effect = fake_batch
+        mock_service.users().messages().list().execute.return_value = {"messages": [{"id": "msg1"}]}
+        mock_service.users().messages().get().execute.return_value = {"id": "msg1", "snippet": "No headers"}
+        
+        result = await search_gmail("test")
+        result_data = json.loads(result)
+        
+        assert result_data["messages"] == [{
+            "id": "msg1", "subject": "", "from": "", "date": "", "labels": [], "snippet": "No headers"
+        }]
+
+    async def test_get_gmail_message_details_without_payload(self, gmail_service):
+        """Test that message details tolerate a response without a payload."""
+        mock_service = gmail_service
+        mock_service.users().messages().get().execute.return_value = {"id": "msg1"}
+        
+        result = await get_gmail_message_details("msg1")
+        result_data = json.loads(result)
+        
+        assert result_data["id"] == "msg1"
+        assert result_data["subject"] == ""
+        assert result_data["body"] == ""
+
+    async def test_search_gmail_fetches_metadata_only(self, gmail_service, fake_batch):
+        """Test that message listings are batched, fetch headers only and skip messages that fail."""
+        mock_service = gmail_service
+        mock_service.new_batch_http_request.side_effect = fake_batch
+        
+        mock_service.users().messages().list().execute.return_value = {
+            "messages": [{"id": "msg1"}, {"id": "missing"}]
+        }
+        
+        from googleapiclient.errors import HttpError
+        requested = []
+        
+        def mock_get_message(userId, id, **kwargs):
+            requested.append(kwargs)
+            mock_msg = Mock()
+            if id == "missing":
+                mock_msg.execute.side_effect = HttpError(resp=Mock(status=404), content=b"Not Found")
+            else:
+                mock_msg.execute.return_value = {
+                    "id": id,
+                    "payload": {"headers": [{"name": "Subject", "value": "Test Email"}]},
+                    "labelIds": ["INBOX"],
+                    "snippet": "Test email content"
+                }
+            return mock_msg
+        
+        mock_service.users().messages().get.side_effect = mock_get_message
+        
+        result = await search_gmail("test")
+        result_data = json.loads(result)
+        
+        assert [message["id"] for message in result_data["messages"]] == ["msg1"]
+        assert result_data["messages"][0]["subject"] == "Test Email"
+        assert all(kwargs["format"] == "metadata" for kwargs in requested)
+        assert all(kwargs["fields"] == "id,snippet,labelIds,payload/headers" for kwargs in requested)
+        mock_service.new_batch_http_request.assert_called_once()
+        
+        # The partial result is not cached, so the next search fetches again
+        await search_gmail("test")
+        assert mock_service.new_batch_http_request.call_count == 2
+
+
+class TestGmailBodyDecoding:
+    """Test cases for Gmail message body decoding."""
+
+    def test_decode_body_full(self):
+        """Test that short bodies are decoded in full."""
+        assert _decode_body("VGVzdCBib2R5IGNvbnRlbnQ=", 1024) == ("Test body content", False)
+
+    def test_decode_body_truncated(self):
+        """Test that long bodies are cut to max_bytes before decoding."""
+        import base64
+        body_data = base64.urlsafe_b64encode(("héllo " * 100).encode("utf-8")).decode()
+        
+        body, truncated = _decode_body(body_data, 9)
+        
+        assert truncated is True
+        assert body == "héllo h"
+
+    def test_decode_body_urlsafe_unpadded(self):
+        """Test that URL-safe characters and stripped padding are handled."""
+        import base64
+        text = "a?b>c~ ünïcode"
+        body_data = base64.urlsafe_b64encode(text.encode("utf-8")).decode().rstrip("=")
+        assert "-" in body_data or "_" in body_data
+        
+        assert _decode_body(body_data, 0) == (text, False)
+
+    def test_decode_body_empty(self):
+        """Test that a missing body decodes to an empty string."""
+        assert _decode_body(None, 1024) == ("", False)
@@ -0,0 +1,138 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import src.mcp_instance as mcp_instance
+from src.mcp_instance import gather_with_concurrency, get_service
+
+
+@pytest.fixture(autouse=True)
+def clear_service_cache():
+    mcp_instance._SERVICE_CACHE.clear()
+    mcp_instance._BUILD_LOCKS.clear()
+    yield
+    mcp_instance._SERVICE_CACHE.clear()
+    mcp_instance._BUILD_LOCKS.clear()
+
+
+@pytest.fixture
+def mock_get_credentials(monkeypatch):
+    """
+    Patches get_credentials_async to return a fresh credentials mock.
+    """
+    mock = AsyncMock(return_value=MagicMock())
+    monkeypatch.setattr(mcp_instance, "get_credentials_async", mock)
+    return mock
+
+
+@pytest.fixture
+def mock_build(monkeypatch):
+    """
+    Patches googleapiclient's build, which get_service imports on first use.
+    """
+    import googleapiclient.discovery
+    mock = MagicMock()
+    monkeypatch.setattr(googleapiclient.discovery, "build", mock)
+    return mock
+
+
+async def test_get_service_builds_once(mock_build, mock_get_credentials):
+    """
+    Tests that get_service reuses the client built for the same API and credentials.
+    """
+    first = await get_service("calendar", "v3")
+    second = await get_service("calendar", "v3")
+
+    assert first is second
+    mock_build.assert_called_once()
+    assert mock_build.call_args[1]["static_discovery"] is True
+
+
+async def test_get_service_separates_apis(mock_build, mock_get_credentials):
+    """
+    Tests that different APIs get their own clients.
+    """
+    mock_build.side_effect = lambda *args, **kwargs: MagicMock()
+
+    calendar = await get_service("calendar", "v3")
+    drive = await get_service("drive", "v3")
+
+    assert calendar is not drive
+    assert mock_build.call_count == 2
+
+
+@pytest.mark.parametrize("api,version", [("calendar", "v3"), ("drive", "v3"), ("gmail", "v1"), ("tasks", "v1")])
+async def test_get_service_builds_without_network(mock_get_credentials, api, version):
+    """
+    Tests that clients are built from the bundled discovery documents without opening a socket.
+    """
+    with patch("socket.socket", side_effect=AssertionError("network access during build")):
+        service = await get_service(api, version)
+
+    assert service is not None
+
+
+async def test_get_service_shares_transport(mock_build, mock_get_credentials):
+    """
+    Tests that all clients are built on the same underlying HTTP transport.
+    """
+    await get_service("calendar", "v3")
+    await get_service("drive", "v3")
+
+    transports = [call[1]["http"].http for call in mock_build.call_args_list]
+    assert transports[0] is transports[1] is mcp_instance._HTTP
+
+
+async def test_get_service_drops_clients_for_replaced_credentials(mock_build, mock_get_credentials):
+    """
+    Tests that clients built for old credentials are evicted when credentials change.
+    """
+    mock_build.side_effect = lambda *args, **kwargs: MagicMock()
+    old_creds, new_creds = MagicMock(), MagicMock()
+
+    mock_get_credentials.return_value = old_creds
+    old_client = await get_service("calendar", "v3")
+
+    mock_get_credentials.return_value = new_creds
+    new_client = await get_service("calendar", "v3")
+
+    assert new_client is not old_client
+    assert list(mcp_instance._SERVICE_CACHE) == [("calendar", "v3", id(new_creds))]
+
+
+async def test_get_service_concurrent_first_calls_build_once(mock_build, mock_get_credentials):
+    """
+    Tests that concurrent first calls for the same API share a single build.
+    """
+    def _slow_build(*args, **kwargs):
+        time.sleep(0.05)
+        return MagicMock()
+
+    mock_build.side_effect = _slow_build
+
+    services = await asyncio.gather(*(get_service("tasks", "v1") for _ in range(5)))
+
+    assert all(service is services[0] for service in services)
+    mock_build.assert_called_once()
+
+
+async def test_gather_with_concurrency_bounds_in_flight_and_keeps_order():
+    """
+    Tests that at most `limit` awaitables run at once and results keep their order.
+    """
+    in_flight = 0
+    peak = 0
+
+    async def _work(value):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return value
+
+    results = await gather_with_concurrency(2, *(_work(i) for i in range(6)))
+
+    assert results == list(range(6))
+    assert peak == 2
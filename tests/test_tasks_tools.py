@@ -1,77 +1,106 @@
 import pytest
 import json
-from unittest.mock import Mock, patch, AsyncMock
-from datetime import datetime, date
+import re
+from types import SimpleNamespace
+import httplib2
 from googleapiclient.errors import HttpError
 
+from src.serialization import to_json
+from src.tools import tasks_tools
 from src.tools.tasks_tools import (
+    _utc_timestamp,
     list_task_lists,
     list_tasks,
     search_tasks,
+    search_all_tasks,
     search_tasks_by_period,
     create_task,
     update_task,
-    mark_task_completed
+    mark_task_completed,
+    mark_tasks_completed
 )
 
+def _http_error(status, reason):
+    # A real httplib2 response, so no Mock is built for the error
+    resp = httplib2.Response({"status": status})
+    resp.reason = reason
+    return HttpError(resp, reason.encode())
+
+_NOT_FOUND = _http_error(404, "Not Found")
+_SERVER_ERROR = _http_error(500, "Internal Server Error")
+
+# Full-equality expectations, serialized once with the tools' own encoder
+_TASK_LISTS = [
+    {"id": "list1", "title": "Personal Tasks", "updated": "2024-01-01T00:00:00Z"},
+    {"id": "list2", "title": "Work Tasks", "updated": "2024-01-02T00:00:00Z"}
+]
+_TASK_LISTS_JSON = to_json(_TASK_LISTS)
+_TASKS = [
+    {"id": "task1", "title": "Task 1", "status": "needsAction"},
+    {"id": "task2", "title": "Task 2", "status": "completed"}
+]
+_TASKS_JSON = to_json([{**task, "taskListId": "@default"} for task in _TASKS])
+
+def _request(response):
+    """
+    Stands in for an API request whose execute() returns `response`, or raises it if it is an error.
+    """
+    def _execute():
+        if isinstance(response, BaseException):
+            raise response
+        return response
+    return SimpleNamespace(execute=_execute)
+
+@pytest.fixture(autouse=True)
+def task_config(monkeypatch):
+    """
+    Pins the task list ID and page size, so the tests do not depend on the environment.
+    """
+    monkeypatch.setattr(tasks_tools, "validate_task_list_id", lambda task_list_id: "@default")
+    monkeypatch.setattr(tasks_tools, "get_default_task_max_results", lambda: 50)
+
+class _RunIoStub:
+    """
+    Async stand-in for run_io that serves `responses` in order, raising any
+    that are errors, and records the functions it was given in `calls`.
+    """
+    def __init__(self):
+        self.responses = []
+        self.calls = []
+
+    async def __call__(self, fn, *args, **kwargs):
+        self.calls.append(fn)
+        response = self.responses[len(self.calls) - 1]
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+@pytest.fixture
+def run_io_stub(monkeypatch):
+    """
+    Replaces run_io so each test serves API responses through the stub.
+    """
+    stub = _RunIoStub()
+    monkeypatch.setattr(tasks_tools, "run_io", stub)
+    return stub
+
 class TestListTaskLists:
-    @pytest.mark.asyncio
-    @patch('src.tools.tasks_tools.asyncio.to_thread')
-    async def test_list_task_lists_success(self, mock_to_thread):
-        # Mock credentials
-        mock_creds = Mock()
-        
-        # Mock service
-        mock_service = Mock()
-        mock_service.tasklists().list().execute.return_value = {
-            "items": [
-                {"id": "list1", "title": "Personal Tasks", "updated": "2024-01-01T00:00:00Z"},
-                {"id": "list2", "title": "Work Tasks", "updated": "2024-01-02T00:00:00Z"}
-            ]
-        }
-        
-        # Mock task lists response
-        mock_response = {
-            "items": [
-                {"id": "list1", "title": "Personal Tasks", "updated": "2024-01-01T00:00:00Z"},
-                {"id": "list2", "title": "Work Tasks", "updated": "2024-01-02T00:00:00Z"}
-            ]
-        }
-        
-        # Set up asyncio.to_thread side effects for the three calls:
-        # 1. get_credentials() 2. build() 3. _list_task_lists()
-        mock_to_thread.side_effect = [mock_creds, mock_service, mock_response]
+    async def test_list_task_lists_success(self, run_io_stub, tasks_service):
+        # Serve the API response; list_task_lists builds new dicts, so the constant is not modified
+        run_io_stub.responses = [{"items": _TASK_LISTS}]
         
         # Call function
         result = await list_task_lists()
-        result_data = json.loads(result)
         
         # Assertions
-        assert len(result_data) == 2
-        assert result_data[0]["id"] == "list1"
-        assert result_data[0]["title"] == "Personal Tasks"
-        assert result_data[1]["id"] == "list2"
-        assert result_data[1]["title"] == "Work Tasks"
+        assert result == _TASK_LISTS_JSON
         
-        # Verify asyncio.to_thread was called 3 times
-        assert mock_to_thread.call_count == 3
+        # Verify the API call went through the I/O executor once
+        assert len(run_io_stub.calls) == 1
 
-    @pytest.mark.asyncio
-    @patch('src.tools.tasks_tools.get_credentials')
-    @patch('src.tools.tasks_tools.build')
-    @patch('src.tools.tasks_tools.asyncio.to_thread')
-    async def test_list_task_lists_http_error(self, mock_to_thread, mock_build, mock_get_credentials):
-        # Mock credentials
-        mock_creds = Mock()
-        mock_get_credentials.return_value = mock_creds
-        
-        # Mock service
-        mock_service = Mock()
-        mock_build.return_value = mock_service
-        
+    async def test_list_task_lists_http_error(self, run_io_stub, tasks_service):
         # Mock HTTP error
-        mock_error = HttpError(Mock(status=500), b"Internal Server Error")
-        mock_to_thread.side_effect = [mock_creds, mock_service, mock_error]
+        run_io_stub.responses = [_SERVER_ERROR]
         
         # Call function
         result = await list_task_lists()
@@ -82,83 +111,38 @@ class TestListTaskLists:
         assert "An error occurred" in result_data["error"]
 
 class TestListTasks:
-    @pytest.mark.asyncio
-    @patch('src.tools.tasks_tools.validate_task_list_id')
-    @patch('src.tools.tasks_tools.get_default_task_max_results')
-    @patch('src.tools.tasks_tools.asyncio.to_thread')
-    async def test_list_tasks_success(self, mock_to_thread, mock_get_max_results, mock_validate):
-        # Mock configuration
-        mock_validate.return_value = "@default"
-        mock_get_max_results.return_value = 50
-        
-        # Mock credentials
-        mock_creds = Mock()
-        
-        # Mock service
-        mock_service = Mock()
-        mock_service.tasks().list().execute.return_value = {
-            "items": [
-                {"id": "task1", "title": "Task 1", "status": "needsAction"},
-                {"id": "task2", "title": "Task 2", "status": "completed"}
-            ]
-        }
-        
-        # Mock tasks response
-        mock_response = {
-            "items": [
-                {"id": "task1", "title": "Task 1", "status": "needsAction"},
-                {"id": "task2", "title": "Task 2", "status": "completed"}
-            ]
-        }
-        
-        # Set up asyncio.to_thread side effects for the three calls:
-        # 1. get_credentials() 2. build() 3. _list_tasks()
-        mock_to_thread.side_effect = [mock_creds, mock_service, mock_response]
+    async def test_list_tasks_success(self, run_io_stub, tasks_service):
+        # Serve the API response; list_tasks annotates the tasks in place, so serve copies
+        run_io_stub.responses = [{"items": [dict(task) for task in _TASKS]}]
         
         # Call function
         result = await list_tasks()
-        result_data = json.loads(result)
         
         # Assertions
-        assert len(result_data) == 2
-        assert result_data[0]["id"] == "task1"
-        assert result_data[0]["taskListId"] == "@default"
-        assert result_data[1]["id"] == "task2"
-        assert result_data[1]["taskListId"] == "@default"
+        assert result == _TASKS_JSON
         
-        # Verify asyncio.to_thread was called 3 times
-        assert mock_to_thread.call_count == 3
+        # Verify the API call went through the I/O executor once
+        assert len(run_io_stub.calls) == 1
+
+@pytest.fixture
+def three_tasks():
+    """
+    A tasks.list response shared by the search tests.
+
+    Function-scoped: the tools add taskListId to the returned tasks in place.
+    """
+    return {
+        "items": [
+            {"id": "task1", "title": "Important meeting", "notes": "Discuss project timeline", "due": "2024-01-15T00:00:00Z"},
+            {"id": "task2", "title": "Buy groceries", "notes": "Milk, bread, eggs", "due": "2024-01-20T00:00:00Z"},
+            {"id": "task3", "title": "Review code", "notes": "Check pull request", "due": "2024-01-25T00:00:00Z"}
+        ]
+    }
 
 class TestSearchTasks:
-    @pytest.mark.asyncio
-    @patch('src.tools.tasks_tools.get_credentials')
-    @patch('src.tools.tasks_tools.build')
-    @patch('src.tools.tasks_tools.asyncio.to_thread')
-    @patch('src.tools.tasks_tools.validate_task_list_id')
-    @patch('src.tools.tasks_tools.get_default_task_max_results')
-    async def test_search_tasks_success(self, mock_get_max_results, mock_validate, mock_to_thread, mock_build, mock_get_credentials):
-        # Mock configuration
-        mock_validate.return_value = "@default"
-        mock_get_max_results.return_value = 50
-        
-        # Mock credentials
-        mock_creds = Mock()
-        mock_get_credentials.return_value = mock_creds
-        
-        # Mock service
-        mock_service = Mock()
-        mock_build.return_value = mock_service
-        
-        # Mock tasks response
-        mock_response = {
-            "items": [
-                {"id": "task1", "title": "Important meeting", "notes": "Discuss project timeline"},
-                {"id": "task2", "title": "Buy groceries", "notes": "Milk, bread, eggs"},
-                {"id": "task3", "title": "Review code", "notes": "Check pull request"}
-            ]
-        }
-        
-        mock_to_thread.side_effect = [mock_creds, mock_service, mock_response]
+    async def test_search_tasks_success(self, run_io_stub, tasks_service, three_tasks):
+        # Serve the API response
+        run_io_stub.responses = [three_tasks]
         
         # Call function
         result = await search_tasks("meeting")
@@ -169,146 +153,170 @@ class TestSearchTasks:
         assert result_data[0]["id"] == "task1"
         assert "meeting" in result_data[0]["title"].lower()
 
-class TestSearchTasksByPeriod:
-    @pytest.mark.asyncio
-    @patch('src.tools.tasks_tools.get_credentials')
-    @patch('src.tools.tasks_tools.build')
-    @patch('src.tools.tasks_tools.asyncio.to_thread')
-    @patch('src.tools.tasks_tools.validate_task_list_id')
-    @patch('src.tools.tasks_tools.get_default_task_max_results')
-    async def test_search_tasks_by_period_success(self, mock_get_max_results, mock_validate, mock_to_thread, mock_build, mock_get_credentials):
-        # Mock configuration
-        mock_validate.return_value = "@default"
-        mock_get_max_results.return_value = 50
-        
-        # Mock credentials
-        mock_creds = Mock()
-        mock_get_credentials.return_value = mock_creds
-        
-        # Mock service
-        mock_service = Mock()
-        mock_build.return_value = mock_service
-        
-        # Mock tasks response
+    async def test_search_tasks_matches_notes_literally(self, run_io_stub, tasks_service):
+        # Mock tasks response; the query contains regex syntax and one task has no notes
         mock_response = {
             "items": [
-                {"id": "task1", "title": "Task 1", "due": "2024-01-15T00:00:00Z"},
-                {"id": "task2", "title": "Task 2", "due": "2024-01-20T00:00:00Z"},
-                {"id": "task3", "title": "Task 3", "due": "2024-01-25T00:00:00Z"}
+                {"id": "task1", "title": "Fix build", "notes": "See ISSUE (#42)"},
+                {"id": "task2", "title": "Issue 42", "notes": None},
+                {"id": "task3", "title": "Untitled"}
             ]
         }
         
-        mock_to_thread.side_effect = [mock_creds, mock_service, mock_response]
+        run_io_stub.responses = [mock_response]
         
         # Call function
-        result = await search_tasks_by_period("2024-01-15", "2024-01-20")
+        result = await search_tasks("issue (#42)")
         result_data = json.loads(result)
         
         # Assertions
-        assert len(result_data) == 2
-        assert result_data[0]["id"] == "task1"
-        assert result_data[1]["id"] == "task2"
+        assert [task["id"] for task in result_data] == ["task1"]
 
-class TestCreateTask:
-    @pytest.mark.asyncio
-    @patch('src.tools.tasks_tools.validate_task_list_id')
-    @patch('src.tools.tasks_tools.asyncio.to_thread')
-    async def test_create_task_success(self, mock_to_thread, mock_validate):
-        # Mock configuration
-        mock_validate.return_value = "@default"
-        
-        # Mock credentials
-        mock_creds = Mock()
+class TestSearchAllTasks:
+    @staticmethod
+    def _configure(mock_service, responses):
+        # Each task list returns its own response, or raises it if it is an HttpError
+        def _list(tasklist, **kwargs):
+            return _request(responses[tasklist])
         
-        # Mock service
-        mock_service = Mock()
-        mock_service.tasks().insert().execute.return_value = {
-            "id": "new_task_123",
-            "title": "New Task",
-            "notes": "Task description",
-            "status": "needsAction"
+        mock_service.tasklists().list().execute.return_value = {
+            "items": [{"id": task_list_id} for task_list_id in responses]
         }
+        mock_service.tasks().list.side_effect = _list
+    
+    async def test_search_all_tasks_merges_lists(self, tasks_service):
+        self._configure(tasks_service, {
+            "list1": {"items": [{"id": "task1", "title": "Plan meeting"}, {"id": "task2", "title": "Groceries"}]},
+            "list2": {"items": [{"id": "task3", "title": "Call", "notes": "About the MEETING"}]}
+        })
         
-        # Mock created task response
-        mock_response = {
-            "id": "new_task_123",
-            "title": "New Task",
-            "notes": "Task description",
-            "status": "needsAction"
+        # Call function
+        result = await search_all_tasks("meeting")
+        result_data = json.loads(result)
+        
+        # Assertions
+        assert [(task["id"], task["taskListId"]) for task in result_data] == [
+            ("task1", "list1"), ("task3", "list2")
+        ]
+    
+    async def test_search_all_tasks_follows_task_list_pages(self, tasks_service):
+        self._configure(tasks_service, {
+            "list1": {"items": [{"id": "task1", "title": "Plan meeting"}]},
+            "list2": {"items": [{"id": "task2", "title": "Meeting notes"}]}
+        })
+        pages = {
+            None: {"items": [{"id": "list1"}], "nextPageToken": "page2"},
+            "page2": {"items": [{"id": "list2"}]}
         }
+        tasks_service.tasklists().list.side_effect = lambda pageToken=None, **kwargs: _request(pages[pageToken])
         
-        # Set up asyncio.to_thread side effects for the three calls:
-        # 1. get_credentials() 2. build() 3. _create_task()
-        mock_to_thread.side_effect = [mock_creds, mock_service, mock_response]
+        # Call function
+        result = await search_all_tasks("meeting")
+        result_data = json.loads(result)
+        
+        # Assertions
+        assert [(task["id"], task["taskListId"]) for task in result_data] == [
+            ("task1", "list1"), ("task2", "list2")
+        ]
+        assert tasks_service.tasklists().list.call_args[1] == {"maxResults": 100, "pageToken": "page2"}
+    
+    async def test_search_all_tasks_skips_failed_list(self, tasks_service):
+        self._configure(tasks_service, {
+            "list1": _NOT_FOUND,
+            "list2": {"items": [{"id": "task3", "title": "Meeting notes"}]}
+        })
         
         # Call function
-        result = await create_task("New Task", description="Task description")
+        result = await search_all_tasks("meeting", max_results=5)
         result_data = json.loads(result)
         
         # Assertions
-        assert result_data["id"] == "new_task_123"
-        assert result_data["title"] == "New Task"
-        assert result_data["notes"] == "Task description"
-        assert result_data["taskListId"] == "@default"
+        assert [task["id"] for task in result_data] == ["task3"]
+    
+    async def test_search_all_tasks_all_lists_failed(self, tasks_service):
+        self._configure(tasks_service, {
+            "list1": _SERVER_ERROR
+        })
         
-        # Verify asyncio.to_thread was called 3 times
-        assert mock_to_thread.call_count == 3
+        # Call function
+        result = await search_all_tasks("meeting")
+        result_data = json.loads(result)
+        
+        # Assertions
+        assert "An error occurred" in result_data["error"]
 
-    @pytest.mark.asyncio
-    @patch('src.tools.tasks_tools.get_credentials')
-    @patch('src.tools.tasks_tools.build')
-    @patch('src.tools.tasks_tools.asyncio.to_thread')
-    @patch('src.tools.tasks_tools.validate_task_list_id')
-    async def test_create_task_with_due_date(self, mock_validate, mock_to_thread, mock_build, mock_get_credentials):
-        # Mock configuration
-        mock_validate.return_value = "@default"
-        
-        # Mock credentials
-        mock_creds = Mock()
-        mock_get_credentials.return_value = mock_creds
+class TestSearchTasksByPeriod:
+    async def test_search_tasks_by_period_success(self, run_io_stub, tasks_service, three_tasks):
+        # Serve the API response
+        run_io_stub.responses = [three_tasks]
         
-        # Mock service
-        mock_service = Mock()
-        mock_build.return_value = mock_service
+        # Call function
+        result = await search_tasks_by_period("2024-01-15", "2024-01-20")
+        result_data = json.loads(result)
         
-        # Mock created task response
-        mock_response = {
-            "id": "new_task_123",
-            "title": "Due Task",
-            "due": "2024-01-31T00:00:00Z"
-        }
+        # Assertions
+        assert len(result_data) == 2
+        assert result_data[0]["id"] == "task1"
+        assert result_data[1]["id"] == "task2"
+
+    async def test_search_tasks_by_period_filters_server_side(self, tasks_service):
+        # Mock service
+        mock_service = tasks_service
+        mock_service.tasks().list().execute.return_value = {"items": []}
         
-        mock_to_thread.side_effect = [mock_creds, mock_service, mock_response]
+        # Call function
+        await search_tasks_by_period("2024-01-15", "2024-01-20")
         
+        # Assertions
+        list_kwargs = mock_service.tasks().list.call_args[1]
+        assert list_kwargs["dueMin"] == "2024-01-15T00:00:00Z"
+        assert list_kwargs["dueMax"] == "2024-01-20T23:59:59Z"
+
+    async def test_search_tasks_by_period_invalid_date(self, run_io_stub, tasks_service):
         # Call function
-        result = await create_task("Due Task", due_date="2024-01-31")
+        result = await search_tasks_by_period("not-a-date", "2024-01-20")
         result_data = json.loads(result)
         
         # Assertions
-        assert result_data["id"] == "new_task_123"
-        assert result_data["title"] == "Due Task"
-        assert "2024-01-31" in result_data["due"]
+        assert result_data["error"] == "Invalid date format. Use YYYY-MM-DD format."
+        assert not run_io_stub.calls
 
-class TestUpdateTask:
-    @pytest.mark.asyncio
-    @patch('src.tools.tasks_tools.validate_task_list_id')
-    @patch('src.tools.tasks_tools.asyncio.to_thread')
-    async def test_update_task_success(self, mock_to_thread, mock_validate):
-        # Mock configuration
-        mock_validate.return_value = "@default"
+class TestCreateTask:
+    @pytest.mark.parametrize("kwargs, mock_response, expected_body", [
+        (
+            {"title": "New Task", "description": "Task description"},
+            {"id": "new_task_123", "title": "New Task", "notes": "Task description", "status": "needsAction"},
+            {"title": "New Task", "notes": "Task description"},
+        ),
+        (
+            {"title": "Due Task", "due_date": "2024-01-31"},
+            {"id": "new_task_123", "title": "Due Task", "due": "2024-01-31T00:00:00Z"},
+            {"title": "Due Task", "due": "2024-01-31T00:00:00Z"},
+        ),
+        (
+            {"title": "Due Task", "due_date": "2024-01-15T23:00:00-05:00"},
+            {"id": "new_task_123", "title": "Due Task", "due": "2024-01-16T04:00:00Z"},
+            {"title": "Due Task", "due": "2024-01-16T04:00:00Z"},
+        ),
+    ], ids=["with_description", "with_due_date", "with_due_date_offset"])
+    async def test_create_task(self, run_io_stub, tasks_service, kwargs, mock_response, expected_body):
+        # Serve the API response
+        run_io_stub.responses = [mock_response]
         
-        # Mock credentials
-        mock_creds = Mock()
+        # Call function
+        result = await create_task(**kwargs)
+        result_data = json.loads(result)
         
-        # Mock service
-        mock_service = Mock()
-        mock_service.tasks().patch().execute.return_value = {
-            "id": "task_123",
-            "title": "Updated Task",
-            "notes": "Updated description",
-            "status": "completed"
-        }
+        # Assertions
+        assert result_data == {**mock_response, "taskListId": "@default"}
         
+        # Verify the API call went through the I/O executor once, with the expected body
+        assert len(run_io_stub.calls) == 1
+        run_io_stub.calls[0]()
+        assert tasks_service.tasks().insert.call_args[1]["body"] == expected_body
+
+class TestUpdateTask:
+    async def test_update_task_success(self, run_io_stub, tasks_service):
         # Mock updated task response
         mock_response = {
             "id": "task_123",
@@ -317,9 +325,8 @@ class TestUpdateTask:
             "status": "completed"
         }
         
-        # Set up asyncio.to_thread side effects for the three calls:
-        # 1. get_credentials() 2. build() 3. _update_task()
-        mock_to_thread.side_effect = [mock_creds, mock_service, mock_response]
+        # Serve the API response
+        run_io_stub.responses = [mock_response]
         
         # Call function
         result = await update_task("task_123", title="Updated Task", description="Updated description", status="completed")
@@ -331,94 +338,87 @@ class TestUpdateTask:
         assert result_data["notes"] == "Updated description"
         assert result_data["status"] == "completed"
         
-        # Verify asyncio.to_thread was called 3 times
-        assert mock_to_thread.call_count == 3
+        # Verify the API call went through the I/O executor once
+        assert len(run_io_stub.calls) == 1
 
 class TestMarkTaskCompleted:
-    @pytest.mark.asyncio
-    @patch('src.tools.tasks_tools.validate_task_list_id')
-    @patch('src.tools.tasks_tools.datetime')
-    @patch('src.tools.tasks_tools.asyncio.to_thread')
-    async def test_mark_task_completed_success(self, mock_to_thread, mock_datetime, mock_validate):
-        # Mock configuration
-        mock_validate.return_value = "@default"
-        
-        # Mock datetime
-        mock_now = datetime(2024, 1, 15, 12, 0, 0)
-        mock_datetime.utcnow.return_value = mock_now
-        
-        # Mock credentials
-        mock_creds = Mock()
-        
-        # Mock service
-        mock_service = Mock()
-        mock_service.tasks().patch().execute.return_value = {
-            "id": "task_123",
-            "title": "Completed Task",
-            "status": "completed",
-            "completed": "2024-01-15T12:00:00Z"
-        }
-        
-        # Mock updated task response
-        mock_response = {
-            "id": "task_123",
-            "title": "Completed Task",
-            "status": "completed",
-            "completed": "2024-01-15T12:00:00Z"
-        }
-        
-        # Set up asyncio.to_thread side effects for the three calls:
-        # 1. get_credentials() 2. build() 3. _update_task()
-        mock_to_thread.side_effect = [mock_creds, mock_service, mock_response]
+    @pytest.mark.parametrize("completed, mock_response, expected_body", [
+        (
+            True,
+            {"id": "task_123", "title": "Completed Task", "status": "completed", "completed": "2024-01-15T12:00:00Z"},
+            {"status": "completed", "completed": "2024-01-15T12:00:00Z"},
+        ),
+        (
+            False,
+            {"id": "task_123", "title": "Incomplete Task", "status": "needsAction"},
+            {"status": "needsAction"},
+        ),
+    ], ids=["completed", "incomplete"])
+    async def test_mark_task_completed(self, monkeypatch, run_io_stub, tasks_service,
+                                       completed, mock_response, expected_body):
+        # Freeze the clock
+        monkeypatch.setattr(tasks_tools, "_utc_timestamp", lambda: "2024-01-15T12:00:00Z")
+        
+        # Serve the API response
+        run_io_stub.responses = [mock_response]
         
         # Call function
-        result = await mark_task_completed("task_123", completed=True)
+        result = await mark_task_completed("task_123", completed=completed)
         result_data = json.loads(result)
         
         # Assertions
-        assert result_data["id"] == "task_123"
-        assert result_data["status"] == "completed"
-        assert result_data["completed"] == "2024-01-15T12:00:00Z"
+        assert result_data == {**mock_response, "taskListId": "@default"}
         
-        # Verify asyncio.to_thread was called 3 times
-        assert mock_to_thread.call_count == 3
-
-    @pytest.mark.asyncio
-    @patch('src.tools.tasks_tools.validate_task_list_id')
-    @patch('src.tools.tasks_tools.asyncio.to_thread')
-    async def test_mark_task_incomplete_success(self, mock_to_thread, mock_validate):
-        # Mock configuration
-        mock_validate.return_value = "@default"
-        
-        # Mock credentials
-        mock_creds = Mock()
-        
-        # Mock service
-        mock_service = Mock()
-        mock_service.tasks().patch().execute.return_value = {
-            "id": "task_123",
-            "title": "Incomplete Task",
-            "status": "needsAction"
-        }
+        # Verify the API call went through the I/O executor once
+        assert len(run_io_stub.calls) == 1
         
-        # Mock updated task response
-        mock_response = {
-            "id": "task_123",
-            "title": "Incomplete Task",
-            "status": "needsAction"
-        }
+        # Verify the status and completion time sent to the API
+        run_io_stub.calls[0]()
+        assert tasks_service.tasks().patch.call_args[1]["body"] == expected_body
+
+    def test_utc_timestamp_format(self):
+        assert re.fullmatch(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z", _utc_timestamp())
+
+class TestMarkTasksCompleted:
+    async def test_mark_tasks_completed_batches_patches(self, fake_batch, tasks_service):
+        # Mock service; task2 does not exist
+        def _patch(tasklist, task, body):
+            if task == "task2":
+                return _request(_NOT_FOUND)
+            return _request({"id": task, "status": body["status"]})
+        
+        mock_service = tasks_service
+        mock_service.tasks().patch.side_effect = _patch
+        mock_service.new_batch_http_request.side_effect = fake_batch
+        
+        # Call function, with a duplicate ID
+        result = await mark_tasks_completed(["task1", "task2", "task3", "task1"])
+        result_data = json.loads(result)
         
-        # Set up asyncio.to_thread side effects for the three calls:
-        # 1. get_credentials() 2. build() 3. _update_task()
-        mock_to_thread.side_effect = [mock_creds, mock_service, mock_response]
+        # Assertions
+        assert [task["id"] for task in result_data["tasks"]] == ["task1", "task3"]
+        assert all(task["status"] == "completed" for task in result_data["tasks"])
+        assert all(task["taskListId"] == "@default" for task in result_data["tasks"])
+        assert [error["id"] for error in result_data["errors"]] == ["task2"]
+        assert result_data["total_updated"] == 2
+        mock_service.new_batch_http_request.assert_called_once()
+    
+    async def test_mark_tasks_completed_reports_missing_response(self, fake_batch, tasks_service):
+        # A batch whose response has no part for task2, so its callback never fires
+        class _TruncatedBatch(fake_batch):
+            def add(self, request, callback=None, request_id=None):
+                if request_id != "task2":
+                    super().add(request, callback, request_id)
+        
+        mock_service = tasks_service
+        mock_service.tasks().patch.side_effect = lambda tasklist, task, body: _request({"id": task})
+        mock_service.new_batch_http_request.side_effect = _TruncatedBatch
         
         # Call function
-        result = await mark_task_completed("task_123", completed=False)
+        result = await mark_tasks_completed(["task1", "task2"])
         result_data = json.loads(result)
         
         # Assertions
-        assert result_data["id"] == "task_123"
-        assert result_data["status"] == "needsAction"
-        
-        # Verify asyncio.to_thread was called 3 times
-        assert mock_to_thread.call_count == 3
+        assert [task["id"] for task in result_data["tasks"]] == ["task1"]
+        assert result_data["errors"] == [{"id": "task2", "error": "No response"}]
+        assert result_data["total_updated"] == 1